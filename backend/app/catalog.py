@@ -0,0 +1,108 @@
+import os
+import time
+import hashlib
+from pymongo import ReturnDocument
+from .database import get_async_db
+
+CATALOG_VERSION_CHECK_SECONDS = float(os.getenv("CATALOG_VERSION_CHECK_SECONDS", "5"))
+CATALOG_CACHE_MAX_ENTRIES = int(os.getenv("CATALOG_CACHE_MAX_ENTRIES", "256"))
+CATALOG_META_COLLECTION = "catalog_meta"
+CATALOG_META_ID = "questions"
+
+def make_etag(body):
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+def etag_matches(if_none_match, etag):
+    """Check an ``If-None-Match`` header against a strong ETag."""
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+class CatalogCache:
+    """Cache of already-encoded question catalog pages, keyed by query.
+
+    Entries hold the JSON bytes, their ETag and the next-page cursor; the
+    oldest entry is dropped once ``max_entries`` is reached. The cache is dropped when this
+    process changes the catalog, and when the shared catalog version stored in
+    Mongo moves (checked at most every ``CATALOG_VERSION_CHECK_SECONDS``), so
+    other workers and the seeding script invalidate it too. A page whose
+    build was already running when the cache was dropped is returned but not
+    stored, since it may predate the change.
+    """
+
+    def __init__(self, check_interval, max_entries):
+        self.check_interval = check_interval
+        self.max_entries = max_entries
+        self._entries = {}
+        # Bumped whenever the entries are dropped
+        self._generation = 0
+        self._version = None
+        self._checked_at = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    def _collection(self):
+        return get_async_db()[CATALOG_META_COLLECTION]
+
+    async def _current_version(self):
+        document = await self._collection().find_one({"_id": CATALOG_META_ID})
+        return document["version"] if document else 0
+
+    async def _check_version(self):
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return
+        version = await self._current_version()
+        if version != self._version:
+            self.invalidate()
+            self._version = version
+        self._checked_at = now
+
+    async def get(self, key, build):
+        """Return ``(body, etag, next_cursor)`` for ``key``.
+
+        On a miss ``build()`` is awaited and must return ``(body, next_cursor)``.
+        """
+        await self._check_version()
+        entry = self._entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            return entry
+        self.misses += 1
+        generation = self._generation
+        body, next_cursor = await build()
+        entry = (body, make_etag(body), next_cursor)
+        if self.max_entries <= 0 or generation != self._generation:
+            return entry
+        if len(self._entries) >= self.max_entries:
+            self._entries.pop(next(iter(self._entries)))
+        self._entries[key] = entry
+        return entry
+
+    def invalidate(self):
+        self._entries.clear()
+        self._generation += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+    async def bump_version(self):
+        """Invalidate every worker's catalog cache after a catalog change."""
+        self.invalidate()
+        result = await self._collection().find_one_and_update(
+            {"_id": CATALOG_META_ID},
+            {"$inc": {"version": 1}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        self._version = result["version"]
+        self._checked_at = time.monotonic()
+
+catalog_cache = CatalogCache(CATALOG_VERSION_CHECK_SECONDS, CATALOG_CACHE_MAX_ENTRIES)
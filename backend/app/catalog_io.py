@@ -0,0 +1,329 @@
+"""Reading, validating and upserting question catalog definitions.
+
+Definitions are streamed record by record from JSONL (or JSON array) input,
+given deterministic tags and turned into ``UpdateOne`` upserts keyed by tag.
+A content hash stored on each document lets re-runs skip unchanged records.
+"""
+import json
+import hashlib
+from datetime import datetime
+from bson import ObjectId
+from typing import List, Optional
+from pydantic import BaseModel, ConfigDict, Field, ValidationError, field_validator
+from pymongo import UpdateOne
+
+CULTURE_NAMES = {
+    "western": "Western",
+    "east_asian": "East Asian",
+    "south_asian": "South Asian",
+    "middle_eastern": "Middle Eastern",
+}
+
+class CatalogRecordError(ValueError):
+    def __init__(self, position, message):
+        super().__init__(f"record {position}: {message}")
+        self.position = position
+        self.message = message
+
+# Written only when a tag is first inserted, and left out of the content hash
+INSERT_ONLY_FIELDS = ("_id", "created_at")
+
+class _Definition(BaseModel):
+    model_config = ConfigDict(populate_by_name=True)
+
+    culture: str
+    # Exported documents keep their tag so a restore maps onto the same keys,
+    # and their id and creation time so references to them keep working
+    tag: Optional[str] = None
+    id: Optional[str] = Field(None, alias="_id")
+    created_at: Optional[datetime] = None
+
+    @field_validator("culture")
+    @classmethod
+    def known_culture(cls, value):
+        if value not in CULTURE_NAMES:
+            raise ValueError(f"unknown culture {value!r}")
+        return value
+
+    @field_validator("id")
+    @classmethod
+    def valid_object_id(cls, value):
+        if value is not None and not ObjectId.is_valid(value):
+            raise ValueError(f"not an ObjectId: {value!r}")
+        return value
+
+class QuestionDefinition(_Definition):
+    question: str
+    options: List[str]
+    correct_answer: str
+    explanation: str
+    category: str
+    difficulty: str
+
+class AdvancedQuestionDefinition(_Definition):
+    question: str
+    correct_answer: str
+
+def _parse_line(line_number, line):
+    if isinstance(line, bytes):
+        line = line.decode("utf-8")
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        return json.loads(line)
+    except json.JSONDecodeError as e:
+        raise CatalogRecordError(line_number, f"invalid JSON ({e.msg})")
+
+def iter_lines(lines):
+    """Yield ``(line_number, record)`` from an iterable of NDJSON lines."""
+    for line_number, line in enumerate(lines, start=1):
+        record = _parse_line(line_number, line)
+        if record is not None:
+            yield line_number, record
+
+async def aiter_lines(chunks):
+    """Yield ``(line_number, record)`` from an async stream of NDJSON bytes."""
+    buffer = b""
+    line_number = 0
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_number += 1
+            record = _parse_line(line_number, line)
+            if record is not None:
+                yield line_number, record
+    record = _parse_line(line_number + 1, buffer)
+    if record is not None:
+        yield line_number + 1, record
+
+def iter_json_array(file, chunk_size=65536):
+    """Yield ``(index, record)`` from a JSON array without loading it whole."""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    index = 0
+    started = False
+    eof = False
+    while True:
+        buffer = buffer.lstrip().lstrip(",").lstrip()
+        if not started and buffer:
+            if buffer[0] != "[":
+                raise CatalogRecordError(0, "expected a JSON array")
+            buffer = buffer[1:]
+            started = True
+            continue
+        if started and buffer.startswith("]"):
+            return
+        if started and buffer:
+            try:
+                record, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError as e:
+                if eof:
+                    raise CatalogRecordError(index + 1, f"invalid JSON ({e.msg})")
+            else:
+                index += 1
+                yield index, record
+                buffer = buffer[end:]
+                continue
+        if eof:
+            if started:
+                raise CatalogRecordError(index + 1, "unterminated JSON array")
+            return
+        chunk = file.read(chunk_size)
+        eof = not chunk
+        buffer += chunk
+
+def iter_file(path):
+    """Stream ``(position, record)`` pairs from a ``.json`` or ``.jsonl`` file."""
+    with open(path, encoding="utf-8") as file:
+        if path.endswith(".json"):
+            yield from iter_json_array(file)
+        else:
+            yield from iter_lines(file)
+
+def validate_record(position, record, definition_cls):
+    try:
+        return definition_cls.model_validate(record)
+    except ValidationError as e:
+        error = e.errors()[0]
+        field = ".".join(str(part) for part in error["loc"])
+        raise CatalogRecordError(position, f"{field}: {error['msg']}" if field else error["msg"])
+
+class TagAssigner:
+    """Tag definitions like ``"Western Greetings - 2"`` in definition order.
+
+    The same input order always produces the same tags, which makes the tag
+    a stable upsert key across re-runs of the full seed file; it is not safe
+    for partial uploads, where position 1 would overwrite the existing
+    question tagged 1. Definitions that already carry a tag keep it. Calling
+    the assigner returns ``(tag, fields)``; ``fields`` only includes the
+    insert-only fields the definition sets.
+    """
+
+    def __init__(self, category_of):
+        self.category_of = category_of
+        self._counts = {}
+
+    def __call__(self, definition):
+        fields = definition.model_dump(by_alias=True)
+        for field in INSERT_ONLY_FIELDS:
+            if fields[field] is None:
+                del fields[field]
+        if not fields["tag"]:
+            key = (definition.culture, self.category_of(definition))
+            self._counts[key] = self._counts.get(key, 0) + 1
+            fields["tag"] = f"{CULTURE_NAMES[key[0]]} {key[1]} - {self._counts[key]}"
+        return fields["tag"], fields
+
+def question_tagger():
+    return TagAssigner(lambda definition: definition.category)
+
+def advanced_question_tagger():
+    return TagAssigner(lambda definition: "Advanced")
+
+def _json_default(value):
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+def export_line(document):
+    """Encode a stored document as one NDJSON line that ``import`` accepts."""
+    document = {field: value for field, value in document.items() if field != "content_hash"}
+    return (json.dumps(document, ensure_ascii=False, default=_json_default) + "\n").encode("utf-8")
+
+def content_hash(fields):
+    canonical = json.dumps(fields, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+def batched(items, batch_size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def split_insert_only(fields):
+    """Split tagged fields into ``(content, insert_only)``, with ``_id`` as an ObjectId."""
+    content = {field: value for field, value in fields.items() if field not in INSERT_ONLY_FIELDS}
+    insert_only = {field: fields[field] for field in INSERT_ONLY_FIELDS if field in fields}
+    if "_id" in insert_only:
+        insert_only["_id"] = ObjectId(insert_only["_id"])
+    return content, insert_only
+
+def plan_upserts(batch, existing_hashes, insert_defaults=None):
+    """Build upserts for the records in ``batch`` whose content changed.
+
+    ``existing_hashes`` maps tag to the stored content hash for this batch;
+    ``insert_defaults`` and a record's own ``_id`` and ``created_at`` are only
+    written when it is first inserted.
+    """
+    operations = []
+    for tag, fields in batch:
+        fields, insert_only = split_insert_only(fields)
+        digest = content_hash(fields)
+        if existing_hashes.get(tag) == digest:
+            continue
+        update = {"$set": {**fields, "content_hash": digest}}
+        on_insert = {**(insert_defaults or {}), **insert_only}
+        if on_insert:
+            update["$setOnInsert"] = on_insert
+        operations.append(UpdateOne({"tag": tag}, update, upsert=True))
+    return operations
+
+def load_collection(collection, records, definition_cls, tagger, batch_size, insert_defaults=None, prune=True):
+    """Validate, tag and upsert ``(position, record)`` pairs with pymongo.
+
+    With ``prune``, documents whose tags were not seen are deleted once every
+    batch has been written. Returns ``(written, unchanged, removed)``.
+    """
+    seen = set()
+    written = unchanged = 0
+    tagged = (tagger(validate_record(position, record, definition_cls)) for position, record in records)
+    for batch in batched(tagged, batch_size):
+        tags = [tag for tag, _ in batch]
+        if prune:
+            seen.update(tags)
+        existing = {
+            document["tag"]: document.get("content_hash")
+            for document in collection.find({"tag": {"$in": tags}}, {"tag": 1, "content_hash": 1})
+        }
+        operations = plan_upserts(batch, existing, insert_defaults)
+        if operations:
+            collection.bulk_write(operations, ordered=False)
+        written += len(operations)
+        unchanged += len(batch) - len(operations)
+
+    removed = 0
+    if prune:
+        stale = [
+            document["_id"] for document in collection.find({}, {"tag": 1})
+            if document.get("tag") not in seen
+        ]
+        for stale_batch in batched(stale, batch_size):
+            collection.delete_many({"_id": {"$in": stale_batch}})
+        removed = len(stale)
+    return written, unchanged, removed
+
+async def load_collection_async(
+    collection, records, definition_cls, tagger, batch_size, insert_defaults=None, prune=False, require_tag=False
+):
+    """Async counterpart of ``load_collection`` for motor and async record streams.
+
+    Only one batch is held at a time, plus the seen tags when pruning. With
+    ``require_tag``, records without a tag are rejected instead of being
+    tagged by position.
+    """
+    seen = set()
+    written = unchanged = 0
+
+    async def write(batch, positions):
+        tags = [tag for tag, _ in batch]
+        if prune:
+            seen.update(tags)
+        # An exported id now held by another tag would fail the insert
+        ids = {
+            ObjectId(fields["_id"]): (position, tag)
+            for position, (tag, fields) in zip(positions, batch) if "_id" in fields
+        }
+        if ids:
+            async for document in collection.find({"_id": {"$in": list(ids)}}, {"tag": 1}):
+                position, tag = ids[document["_id"]]
+                if document.get("tag") != tag:
+                    raise CatalogRecordError(position, f"_id: already used by {document.get('tag')!r}")
+        cursor = collection.find({"tag": {"$in": tags}}, {"tag": 1, "content_hash": 1})
+        existing = {document["tag"]: document.get("content_hash") async for document in cursor}
+        operations = plan_upserts(batch, existing, insert_defaults)
+        if operations:
+            await collection.bulk_write(operations, ordered=False)
+        return len(operations), len(batch) - len(operations)
+
+    batch = []
+    positions = []
+    async for position, record in records:
+        definition = validate_record(position, record, definition_cls)
+        if require_tag and not definition.tag:
+            raise CatalogRecordError(position, "tag: required; seed untagged files with scripts/add_questions.py")
+        batch.append(tagger(definition))
+        positions.append(position)
+        if len(batch) >= batch_size:
+            batch_written, batch_unchanged = await write(batch, positions)
+            written, unchanged = written + batch_written, unchanged + batch_unchanged
+            batch = []
+            positions = []
+    if batch:
+        batch_written, batch_unchanged = await write(batch, positions)
+        written, unchanged = written + batch_written, unchanged + batch_unchanged
+
+    removed = 0
+    if prune:
+        stale = [document["_id"] async for document in collection.find({}, {"tag": 1}) if document.get("tag") not in seen]
+        for stale_batch in batched(stale, batch_size):
+            await collection.delete_many({"_id": {"$in": stale_batch}})
+        removed = len(stale)
+    return written, unchanged, removed
@@ -1,22 +1,134 @@
 from mongoengine import connect
 import os
-from dotenv import load_dotenv
+import asyncio
 from pytz import timezone
+from pymongo import ReadPreference
+from pymongo.errors import OperationFailure
+from motor.motor_asyncio import AsyncIOMotorClient
+from .metrics import mongo_listener
 
-# Load environment variables
-load_dotenv()
+DB_NAME = "mannerisms"
+DB_TIMEZONE = timezone('US/Eastern')
 
-# Get MongoDB URI from environment variables
-MONGO_URI = os.getenv("MONGO_URI")
-if not MONGO_URI:
-    raise ValueError("MONGO_URI environment variable is not set")
+# Connection pool and timeout configuration, shared by both clients
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "0")) or None
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "20000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "30000"))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "0")) or None
+MONGO_READ_PREFERENCE = os.getenv("MONGO_READ_PREFERENCE", "primary")
+
+# IndexOptionsConflict and IndexKeySpecsConflict: an index on the same keys
+# already exists with other options, e.g. created before it was declared unique
+INDEX_CONFLICT_CODES = (85, 86)
+
+READ_PREFERENCES = {
+    "primary": ReadPreference.PRIMARY,
+    "primaryPreferred": ReadPreference.PRIMARY_PREFERRED,
+    "secondary": ReadPreference.SECONDARY,
+    "secondaryPreferred": ReadPreference.SECONDARY_PREFERRED,
+    "nearest": ReadPreference.NEAREST,
+}
+
+# Shared async client, created lazily so it binds to the running event loop
+_async_client = None
+
+def _mongo_uri():
+    mongo_uri = os.getenv("MONGO_URI")
+    if not mongo_uri:
+        raise ValueError("MONGO_URI environment variable is not set")
+    return mongo_uri
+
+def client_options():
+    """Keyword arguments for ``MongoClient``/``AsyncIOMotorClient`` from the environment."""
+    if MONGO_READ_PREFERENCE not in READ_PREFERENCES:
+        raise ValueError(
+            f"Unknown MONGO_READ_PREFERENCE {MONGO_READ_PREFERENCE!r}; expected one of {', '.join(READ_PREFERENCES)}"
+        )
+    return {
+        "tz_aware": True,
+        "tzinfo": DB_TIMEZONE,
+        "maxPoolSize": MONGO_MAX_POOL_SIZE,
+        "minPoolSize": MONGO_MIN_POOL_SIZE,
+        "maxIdleTimeMS": MONGO_MAX_IDLE_TIME_MS,
+        "connectTimeoutMS": MONGO_CONNECT_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "socketTimeoutMS": MONGO_SOCKET_TIMEOUT_MS,
+        "read_preference": READ_PREFERENCES[MONGO_READ_PREFERENCE],
+        "event_listeners": [mongo_listener],
+    }
 
 def connect_db():
-    """Connect to MongoDB using the URI from environment variables."""
+    """Connect mongoengine (used by the scripts) using the URI from environment variables."""
     try:
-        # Add database name to the connection
-        connect(host=MONGO_URI, db="mannerisms", tz_aware=True, tzinfo=timezone('US/Eastern'))
+        connect(host=_mongo_uri(), db=DB_NAME, **client_options())
         print("Successfully connected to MongoDB")
     except Exception as e:
         print(f"Error connecting to MongoDB: {e}")
-        raise 
\ No newline at end of file
+        raise
+
+def get_async_db():
+    """Return the async (motor) database handle used on the request path."""
+    global _async_client
+    if _async_client is None:
+        _async_client = AsyncIOMotorClient(_mongo_uri(), **client_options())
+    return _async_client[DB_NAME]
+
+def close_async_db():
+    """Close the shared async client if it was opened."""
+    global _async_client
+    if _async_client is not None:
+        _async_client.close()
+        _async_client = None
+
+async def ping():
+    await get_async_db().command("ping")
+
+async def warm_pool(connections):
+    """Open up to ``connections`` pooled connections by pinging concurrently."""
+    await asyncio.gather(*(ping() for _ in range(max(1, connections))))
+
+def _index_options(spec):
+    return {key: value for key, value in spec.items() if key != "fields"}
+
+def _report_index_conflict(collection_name, spec, error):
+    if error.code not in INDEX_CONFLICT_CODES:
+        raise error
+    print(
+        f"[{collection_name}] index {spec['fields']} conflicts with an existing index "
+        f"({error.details.get('errmsg', error) if error.details else error}); "
+        "rebuild it with python -m scripts.ensure_indexes --rebuild"
+    )
+
+async def ensure_indexes(models):
+    """Create the indexes declared on ``models``; existing ones are left alone.
+
+    An existing index on the same keys with different options is reported and
+    skipped rather than stopping startup; scripts/ensure_indexes.py rebuilds it.
+    Returns the skipped unique indexes as ``"collection.fields"`` names, since
+    writes rely on them to reject duplicates.
+    """
+    db = get_async_db()
+    unresolved = []
+    for model in models:
+        collection_name = model._get_collection_name()
+        for spec in model._meta["index_specs"]:
+            try:
+                await db[collection_name].create_index(spec["fields"], **_index_options(spec))
+            except OperationFailure as e:
+                _report_index_conflict(collection_name, spec, e)
+                if spec.get("unique"):
+                    unresolved.append(f"{collection_name}.{'_'.join(field for field, _ in spec['fields'])}")
+    return unresolved
+
+def ensure_indexes_sync(models):
+    """``ensure_indexes`` for the scripts, through the mongoengine connection."""
+    for model in models:
+        collection_name = model._get_collection_name()
+        collection = model._get_db()[collection_name]
+        for spec in model._meta["index_specs"]:
+            try:
+                collection.create_index(spec["fields"], **_index_options(spec))
+            except OperationFailure as e:
+                _report_index_conflict(collection_name, spec, e)
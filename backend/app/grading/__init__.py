@@ -0,0 +1 @@
+"""Grading of free-text answers to advanced questions."""
@@ -0,0 +1,131 @@
+import os
+import math
+import time
+import asyncio
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from ..metrics import (
+    GRADING_IN_FLIGHT, GRADING_QUEUE_DEPTH, GRADING_QUEUE_WAIT, GRADING_REJECTIONS
+)
+
+# LLM calls in flight across the whole process
+GRADING_MAX_CONCURRENCY = int(os.getenv("GRADING_MAX_CONCURRENCY", "32"))
+# Calls allowed to wait for a free slot; more are rejected straight away
+GRADING_MAX_QUEUE = int(os.getenv("GRADING_MAX_QUEUE", "128"))
+# Longest a call waits for a slot before it is rejected
+GRADING_QUEUE_TIMEOUT_SECONDS = float(os.getenv("GRADING_QUEUE_TIMEOUT_SECONDS", "10"))
+# Per-user token bucket: sustained gradings per second and burst size (rate 0 disables)
+GRADING_USER_RATE = float(os.getenv("GRADING_USER_RATE", "0.5"))
+GRADING_USER_BURST = int(os.getenv("GRADING_USER_BURST", "5"))
+GRADING_USER_BUCKETS_MAX = int(os.getenv("GRADING_USER_BUCKETS_MAX", "100000"))
+
+class GradingOverloaded(Exception):
+    """Raised when no grading slot is available in time."""
+
+    def __init__(self, retry_after):
+        super().__init__("Grading is at capacity")
+        self.retry_after = retry_after
+
+class AdmissionController:
+    """Caps concurrent LLM calls, with a bounded queue and a wait deadline.
+
+    A call waits for one of ``max_concurrency`` slots. If ``max_queue`` calls
+    are already waiting, or no slot frees up within ``queue_timeout`` seconds,
+    it fails fast with ``GradingOverloaded`` instead of adding to the pile-up.
+    """
+
+    def __init__(self, max_concurrency, max_queue, queue_timeout):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._waiting = 0
+        self._in_flight = 0
+        # Moving average of slot hold time, used to suggest a retry delay
+        self._average_hold = 1.0
+
+    def retry_after(self):
+        """Whole seconds until the current queue is expected to drain."""
+        backlog = (self._waiting + 1) / self.max_concurrency
+        return max(1, math.ceil(backlog * self._average_hold))
+
+    def _reject(self, reason):
+        GRADING_REJECTIONS.labels(reason).inc()
+        raise GradingOverloaded(self.retry_after())
+
+    async def _acquire(self):
+        if not self._semaphore.locked():
+            await self._semaphore.acquire()
+            GRADING_QUEUE_WAIT.observe(0.0)
+            return
+        if self._waiting >= self.max_queue:
+            self._reject("queue_full")
+
+        self._waiting += 1
+        GRADING_QUEUE_DEPTH.set(self._waiting)
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._reject("timeout")
+        finally:
+            self._waiting -= 1
+            GRADING_QUEUE_DEPTH.set(self._waiting)
+            GRADING_QUEUE_WAIT.observe(time.perf_counter() - start)
+
+    @asynccontextmanager
+    async def slot(self):
+        await self._acquire()
+        self._in_flight += 1
+        GRADING_IN_FLIGHT.set(self._in_flight)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._average_hold = 0.9 * self._average_hold + 0.1 * (time.perf_counter() - start)
+            self._in_flight -= 1
+            GRADING_IN_FLIGHT.set(self._in_flight)
+            self._semaphore.release()
+
+    def stats(self):
+        return {"in_flight": self._in_flight, "waiting": self._waiting}
+
+class TokenBuckets:
+    """Per-key token buckets refilled at ``rate`` tokens per second up to ``burst``.
+
+    Only the ``max_keys`` most recently used buckets are kept; a dropped
+    bucket simply starts full again.
+    """
+
+    def __init__(self, rate, burst, max_keys):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+
+    def take(self, key, cost=1):
+        """Spend ``cost`` tokens; return 0 on success or the seconds to wait otherwise.
+
+        A cost above the burst size is admitted once the bucket is full and
+        then drives it negative, so the full cost is always charged and the
+        user waits off the excess before grading again.
+        """
+        if self.rate <= 0:
+            return 0
+        needed = min(cost, self.burst)
+        now = time.monotonic()
+        tokens, updated = self._buckets.pop(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        wait = 0
+        if tokens >= needed:
+            tokens -= cost
+        else:
+            wait = (needed - tokens) / self.rate
+            GRADING_REJECTIONS.labels("rate_limited").inc()
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return wait
+
+admission = AdmissionController(GRADING_MAX_CONCURRENCY, GRADING_MAX_QUEUE, GRADING_QUEUE_TIMEOUT_SECONDS)
+user_rate_limiter = TokenBuckets(GRADING_USER_RATE, GRADING_USER_BURST, GRADING_USER_BUCKETS_MAX)
@@ -0,0 +1,135 @@
+import os
+import json
+import random
+import asyncio
+import hashlib
+from collections import namedtuple
+from .client import init_client, get_client, close_client, OPEN_AI_MODEL
+
+# Which backend grades answers: "openai" (any OpenAI-compatible API) or "local"
+GRADER_BACKEND = os.getenv("GRADER_BACKEND", "openai")
+
+# Simulated latency of the local backend
+LOCAL_GRADER_LATENCY_MS = float(os.getenv("LOCAL_GRADER_LATENCY_MS", "0"))
+LOCAL_GRADER_JITTER_MS = float(os.getenv("LOCAL_GRADER_JITTER_MS", "0"))
+
+Usage = namedtuple("Usage", ["prompt_tokens", "completion_tokens"])
+
+class OpenAIBackend:
+    """Grades through the shared OpenAI client.
+
+    Point ``GRADER_BASE_URL`` at any OpenAI-compatible server (vLLM, Ollama,
+    a gateway) to use a self-hosted model.
+    """
+
+    def __init__(self):
+        self.model = OPEN_AI_MODEL
+
+    def start(self):
+        init_client()
+
+    async def close(self):
+        await close_client()
+
+    async def complete(self, messages, **options):
+        """Return ``(content, usage)`` for a single completion.
+
+        ``options`` (``max_tokens``, ``response_format``...) are passed to the API as is.
+        """
+        response = await get_client().chat.completions.create(
+            model=self.model,
+            messages=messages,
+            **options
+        )
+        return response.choices[0].message.content, response.usage
+
+    async def stream(self, messages, **options):
+        """Yield the completion text piece by piece."""
+        stream = await get_client().chat.completions.create(
+            model=self.model,
+            messages=messages,
+            stream=True,
+            **options
+        )
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                yield delta
+
+class LocalBackend:
+    """Deterministic offline grader for tests and benchmarks.
+
+    The score is derived from a hash of the prompt, so the same answer always
+    gets the same grade, and replies arrive after a configurable delay. Of the
+    completion options only ``max_tokens`` is honoured, at about four
+    characters per token.
+    """
+
+    model = "local"
+    stream_chunk_size = 16
+
+    def __init__(self, latency_ms=LOCAL_GRADER_LATENCY_MS, jitter_ms=LOCAL_GRADER_JITTER_MS):
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.calls = 0
+
+    def start(self):
+        pass
+
+    async def close(self):
+        pass
+
+    async def _wait(self):
+        self.calls += 1
+        delay = self.latency + random.uniform(-self.jitter, self.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def _reply(self, messages, max_tokens=None, **options):
+        digest = hashlib.sha256(messages[-1]["content"].encode("utf-8")).digest()
+        score = int.from_bytes(digest[:4], "big") % 101
+        if score >= 80:
+            feedback = "Strong answer that reflects the key cultural points."
+        elif score >= 50:
+            feedback = "Partly right; some important cultural context is missing."
+        else:
+            feedback = "This misses the main cultural expectations in the question."
+        content = json.dumps({"score": score, "response": feedback})
+        return content[:max_tokens * 4] if max_tokens else content
+
+    async def complete(self, messages, **options):
+        await self._wait()
+        content = self._reply(messages, **options)
+        prompt_length = sum(len(message["content"]) for message in messages)
+        return content, Usage(prompt_length // 4, len(content) // 4)
+
+    async def stream(self, messages, **options):
+        await self._wait()
+        content = self._reply(messages, **options)
+        for i in range(0, len(content), self.stream_chunk_size):
+            yield content[i:i + self.stream_chunk_size]
+
+BACKENDS = {
+    "openai": OpenAIBackend,
+    "local": LocalBackend,
+}
+
+_backend = None
+
+def get_backend():
+    """Return the process-wide grader backend selected by ``GRADER_BACKEND``."""
+    global _backend
+    if _backend is None:
+        if GRADER_BACKEND not in BACKENDS:
+            raise ValueError(f"Unknown GRADER_BACKEND {GRADER_BACKEND!r}; expected one of {', '.join(BACKENDS)}")
+        _backend = BACKENDS[GRADER_BACKEND]()
+        _backend.start()
+    return _backend
+
+async def close_backend():
+    global _backend
+    if _backend is not None:
+        await _backend.close()
+        _backend = None
@@ -0,0 +1,102 @@
+import os
+import re
+import time
+import hashlib
+from collections import OrderedDict
+from datetime import datetime
+from ..database import get_async_db
+
+GRADING_CACHE_SIZE = int(os.getenv("GRADING_CACHE_SIZE", "10000"))
+GRADING_CACHE_TTL_SECONDS = int(os.getenv("GRADING_CACHE_TTL_SECONDS", "86400"))
+GRADING_CACHE_PERSISTENT = os.getenv("GRADING_CACHE_PERSISTENT", "false").lower() == "true"
+GRADING_CACHE_COLLECTION = "grading_cache"
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_answer(answer):
+    """Fold case, punctuation and whitespace so trivially different answers share a key."""
+    answer = _PUNCTUATION.sub(" ", answer.casefold())
+    return _WHITESPACE.sub(" ", answer).strip()
+
+def make_key(question_id, user_answer, model, prompt_version):
+    raw = "\x1f".join([str(question_id), normalize_answer(user_answer), str(model), prompt_version])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+class GradingCache:
+    """Bounded LRU cache of grading results with TTL expiry.
+
+    When ``persistent`` is set, entries are also written to a Mongo collection
+    with a TTL index so they survive restarts and are shared between workers.
+    """
+
+    def __init__(self, max_size, ttl_seconds, persistent=False):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.persistent = persistent
+        self._entries = OrderedDict()
+        self._indexes_ready = False
+        self.hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+
+    def _collection(self):
+        return get_async_db()[GRADING_CACHE_COLLECTION]
+
+    async def _ensure_indexes(self):
+        if not self._indexes_ready:
+            await self._collection().create_index("created_at", expireAfterSeconds=self.ttl_seconds)
+            self._indexes_ready = True
+
+    async def get(self, key):
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, result = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return dict(result)
+            del self._entries[key]
+
+        if self.persistent:
+            document = await self._collection().find_one({"_id": key})
+            if document is not None:
+                self._store(key, document["result"])
+                self.persistent_hits += 1
+                return dict(document["result"])
+
+        self.misses += 1
+        return None
+
+    async def set(self, key, result):
+        self._store(key, result)
+        if self.persistent:
+            await self._ensure_indexes()
+            await self._collection().replace_one(
+                {"_id": key},
+                {"_id": key, "result": result, "created_at": datetime.utcnow()},
+                upsert=True,
+            )
+
+    def _store(self, key, result):
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, dict(result))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.persistent_hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "persistent_hits": self.persistent_hits,
+            "misses": self.misses,
+            "hit_ratio": (self.hits + self.persistent_hits) / lookups if lookups else 0.0,
+        }
+
+grading_cache = GradingCache(
+    GRADING_CACHE_SIZE, GRADING_CACHE_TTL_SECONDS, persistent=GRADING_CACHE_PERSISTENT
+)
@@ -0,0 +1,49 @@
+import os
+import httpx
+from openai import AsyncOpenAI
+from .resilience import GRADING_CALL_TIMEOUT_SECONDS
+
+OPEN_AI_API_KEY = os.getenv("OPEN_AI_API_KEY")
+OPEN_AI_MODEL = os.getenv("OPEN_AI_MODEL")
+# Base URL of an OpenAI-compatible API; unset means api.openai.com
+GRADER_BASE_URL = os.getenv("GRADER_BASE_URL") or None
+
+# Connection pool configuration for the shared client
+OPEN_AI_MAX_CONNECTIONS = int(os.getenv("OPEN_AI_MAX_CONNECTIONS", "100"))
+OPEN_AI_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("OPEN_AI_MAX_KEEPALIVE_CONNECTIONS", "20"))
+OPEN_AI_KEEPALIVE_EXPIRY = float(os.getenv("OPEN_AI_KEEPALIVE_EXPIRY", "30"))
+# Retries inside the SDK; off by default because grading/resilience.py retries with backoff itself
+OPEN_AI_MAX_RETRIES = int(os.getenv("OPEN_AI_MAX_RETRIES", "0"))
+
+_client = None
+
+def init_client():
+    """Create the process-wide async OpenAI client and its connection pool."""
+    global _client
+    if _client is None:
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=OPEN_AI_MAX_CONNECTIONS,
+                max_keepalive_connections=OPEN_AI_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=OPEN_AI_KEEPALIVE_EXPIRY,
+            )
+        )
+        options = {"timeout": GRADING_CALL_TIMEOUT_SECONDS} if GRADING_CALL_TIMEOUT_SECONDS > 0 else {}
+        _client = AsyncOpenAI(
+            api_key=OPEN_AI_API_KEY,
+            base_url=GRADER_BASE_URL,
+            http_client=http_client,
+            max_retries=OPEN_AI_MAX_RETRIES,
+            **options
+        )
+    return _client
+
+def get_client():
+    return init_client()
+
+async def close_client():
+    """Close the shared client, releasing pooled connections."""
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
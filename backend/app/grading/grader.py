@@ -0,0 +1,171 @@
+import os
+import asyncio
+import time
+from .cache import grading_cache, make_key
+from .backends import get_backend
+from .prompts import PROMPT_VERSION, build_messages
+from .output import InvalidGradeOutput, parse_grade
+from .streaming import GradeStreamParser
+from .prescore import PRESCORE_ENABLED, prescorer
+from .admission import admission
+from .resilience import GraderUnavailable, resilience
+from ..metrics import GRADE_OUTPUTS, GRADING_DEGRADED, LLM_REQUEST_DURATION, observe_llm_usage
+
+GRADING_BATCH_CONCURRENCY = int(os.getenv("GRADING_BATCH_CONCURRENCY", "8"))
+# Cap on reply length; a score and two sentences of feedback fit well within it (0 disables)
+GRADING_MAX_OUTPUT_TOKENS = int(os.getenv("GRADING_MAX_OUTPUT_TOKENS", "200"))
+# Ask for a JSON object via response_format; turn off for servers that do not support it
+GRADING_JSON_MODE = os.getenv("GRADING_JSON_MODE", "true").lower() == "true"
+# Follow-up calls asking the model to fix a reply that could not be repaired locally
+GRADING_REPAIR_ATTEMPTS = int(os.getenv("GRADING_REPAIR_ATTEMPTS", "1"))
+# While the LLM is unavailable, answer with a locally estimated score instead of an error
+GRADING_DEGRADED_RESPONSES = os.getenv("GRADING_DEGRADED_RESPONSES", "true").lower() == "true"
+
+REPAIR_INSTRUCTION = 'That was not valid JSON. Reply with only {"score": <0-100>, "response": "<feedback>"}.'
+
+def completion_options():
+    options = {}
+    if GRADING_MAX_OUTPUT_TOKENS > 0:
+        options["max_tokens"] = GRADING_MAX_OUTPUT_TOKENS
+    if GRADING_JSON_MODE:
+        options["response_format"] = {"type": "json_object"}
+    return options
+
+async def _complete(backend, messages):
+    async def attempt():
+        start = time.perf_counter()
+        try:
+            return await backend.complete(messages, **completion_options())
+        finally:
+            LLM_REQUEST_DURATION.labels("grade").observe(time.perf_counter() - start)
+
+    content, usage = await resilience.call(attempt, "grade")
+    observe_llm_usage(usage, PROMPT_VERSION)
+    return content
+
+async def _complete_grade(backend, messages):
+    """Call the model and parse its reply, re-asking up to ``GRADING_REPAIR_ATTEMPTS`` times."""
+    content = await _complete(backend, messages)
+    for attempt in range(GRADING_REPAIR_ATTEMPTS + 1):
+        try:
+            parsed_response, repaired = parse_grade(content)
+        except InvalidGradeOutput:
+            GRADE_OUTPUTS.labels("invalid").inc()
+            if attempt == GRADING_REPAIR_ATTEMPTS:
+                raise
+            content = await _complete(backend, messages + [
+                {"role": "assistant", "content": content or ""},
+                {"role": "user", "content": REPAIR_INSTRUCTION},
+            ])
+            continue
+        GRADE_OUTPUTS.labels("repaired" if repaired else "valid").inc()
+        return parsed_response
+
+async def _degraded(question, user_answer):
+    GRADING_DEGRADED.inc()
+    return await prescorer.estimate(question, user_answer)
+
+async def grade_answer(question, user_answer, allow_degraded=True):
+    """Grade an answer to an advanced question and return the parsed JSON reply.
+
+    Clear-cut answers are settled by the local pre-scorer. LLM results are
+    cached per question and normalized answer, so repeated answers skip the
+    round-trip. Malformed replies are repaired where possible; otherwise
+    ``InvalidGradeOutput`` is raised. When the LLM is unavailable the result
+    is a local estimate marked ``degraded``, unless ``allow_degraded`` is off
+    and ``GraderUnavailable`` is raised instead. Estimates are not cached.
+    """
+    if PRESCORE_ENABLED:
+        prescored = await prescorer.score(question, user_answer)
+        if prescored is not None:
+            return prescored
+
+    backend = get_backend()
+    cache_key = make_key(question["_id"], user_answer, backend.model, PROMPT_VERSION)
+    cached = await grading_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    try:
+        # Fail fast before queueing for a slot if the breaker is open
+        resilience.check()
+        async with admission.slot():
+            parsed_response = await _complete_grade(backend, build_messages(question, user_answer))
+    except GraderUnavailable:
+        if not (allow_degraded and GRADING_DEGRADED_RESPONSES):
+            raise
+        return await _degraded(question, user_answer)
+    await grading_cache.set(cache_key, parsed_response)
+    return parsed_response
+
+async def grade_answers(items):
+    """Grade several ``(question, user_answer)`` pairs concurrently.
+
+    At most ``GRADING_BATCH_CONCURRENCY`` LLM calls are in flight at once;
+    results are returned in the order of ``items``. An item that fails is
+    returned as its exception, so one bad item does not fail the others.
+    """
+    semaphore = asyncio.Semaphore(GRADING_BATCH_CONCURRENCY)
+
+    async def grade_one(question, user_answer):
+        async with semaphore:
+            return await grade_answer(question, user_answer)
+
+    results = await asyncio.gather(
+        *(grade_one(question, user_answer) for question, user_answer in items),
+        return_exceptions=True,
+    )
+    for result in results:
+        if isinstance(result, BaseException) and not isinstance(result, Exception):
+            raise result
+    return results
+
+async def stream_grade(question, user_answer):
+    """Grade an answer while streaming the completion.
+
+    Yields ``("score", int)`` as soon as the score is known, ``("feedback", str)``
+    for each piece of feedback text and finally ``("done", parsed_response)``.
+    """
+    backend = get_backend()
+    cache_key = make_key(question["_id"], user_answer, backend.model, PROMPT_VERSION)
+    cached = await prescorer.score(question, user_answer) if PRESCORE_ENABLED else None
+    if cached is None:
+        cached = await grading_cache.get(cache_key)
+    if cached is not None:
+        yield "score", cached.get("score", 0)
+        yield "feedback", cached.get("response", "No response provided.")
+        yield "done", cached
+        return
+
+    # Streamed completions carry no usage, so only latency and errors are recorded.
+    # GraderUnavailable only escapes before the first chunk, so nothing has been sent yet.
+    parser = GradeStreamParser()
+    messages = build_messages(question, user_answer)
+    try:
+        resilience.check()
+        async with admission.slot():
+            start = time.perf_counter()
+            try:
+                async for delta in resilience.stream(lambda: backend.stream(messages, **completion_options()), "stream"):
+                    for event in parser.feed(delta):
+                        yield event
+            finally:
+                LLM_REQUEST_DURATION.labels("stream").observe(time.perf_counter() - start)
+    except GraderUnavailable:
+        if not GRADING_DEGRADED_RESPONSES:
+            raise
+        degraded = await _degraded(question, user_answer)
+        yield "score", degraded["score"]
+        yield "feedback", degraded["response"]
+        yield "done", degraded
+        return
+
+    # Feedback has already been sent, so a bad reply is repaired locally or fails
+    try:
+        parsed_response, repaired = parse_grade(parser.buffer)
+    except InvalidGradeOutput:
+        GRADE_OUTPUTS.labels("invalid").inc()
+        raise
+    GRADE_OUTPUTS.labels("repaired" if repaired else "valid").inc()
+    await grading_cache.set(cache_key, parsed_response)
+    yield "done", parsed_response
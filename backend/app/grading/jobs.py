@@ -0,0 +1,148 @@
+import os
+import uuid
+import socket
+import asyncio
+from .grader import grade_answer
+from .admission import GradingOverloaded
+from .resilience import GraderUnavailable
+from ..repositories import advanced_questions, grading_jobs, progress
+
+# Background workers per process (0 leaves jobs to other processes)
+GRADING_JOB_WORKERS = int(os.getenv("GRADING_JOB_WORKERS", "4"))
+# How long a claimed job stays with its worker; keep above the slowest grading call
+GRADING_JOB_LEASE_SECONDS = int(os.getenv("GRADING_JOB_LEASE_SECONDS", "120"))
+GRADING_JOB_MAX_ATTEMPTS = int(os.getenv("GRADING_JOB_MAX_ATTEMPTS", "3"))
+# How often idle workers and waiting pollers re-check Mongo
+GRADING_JOB_POLL_SECONDS = float(os.getenv("GRADING_JOB_POLL_SECONDS", "1"))
+
+FINISHED_STATUSES = ("done", "failed")
+
+class GradingWorkerPool:
+    """Grades queued jobs in background tasks.
+
+    Jobs live in Mongo and are leased one at a time, so any process can pick
+    up work left behind by one that stopped; a job whose lease expires is
+    simply claimed again. Jobs submitted in this process wake an idle worker
+    straight away, and waiters on this process are told as soon as a job
+    finishes; everything else falls back to polling.
+    """
+
+    def __init__(self, size, lease_seconds, max_attempts, poll_seconds):
+        self.size = size
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.poll_seconds = poll_seconds
+        self.worker_prefix = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._tasks = []
+        self._wake = None
+        # job id -> [event, number of requests waiting on it]
+        self._waiters = {}
+
+    def start(self):
+        self._wake = asyncio.Event()
+        self._tasks = [
+            asyncio.create_task(self._run(f"{self.worker_prefix}:{n}")) for n in range(self.size)
+        ]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify_submitted(self):
+        if self._wake is not None:
+            self._wake.set()
+
+    async def wait_for(self, job_id, timeout):
+        """Wait up to ``timeout`` seconds for this process to finish ``job_id``."""
+        waiter = self._waiters.setdefault(job_id, [asyncio.Event(), 0])
+        waiter[1] += 1
+        try:
+            await asyncio.wait_for(waiter[0].wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            waiter[1] -= 1
+            if waiter[1] == 0 and self._waiters.get(job_id) is waiter:
+                del self._waiters[job_id]
+
+    def _announce(self, job_id):
+        waiter = self._waiters.pop(str(job_id), None)
+        if waiter is not None:
+            waiter[0].set()
+
+    async def _next_job(self, worker_id):
+        job = await grading_jobs.claim_unapplied(worker_id, self.lease_seconds)
+        if job is None:
+            job = await grading_jobs.claim(worker_id, self.lease_seconds)
+        return job
+
+    async def _run(self, worker_id):
+        while True:
+            try:
+                job = await self._next_job(worker_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Grading worker {worker_id} could not claim a job: {e}")
+                job = None
+            if job is None:
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                await self._process(job, worker_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # The job stays leased and is picked up again once the lease expires
+                print(f"Grading worker {worker_id} failed on job {job['_id']}: {e}")
+
+    async def _process(self, job, worker_id):
+        job_id = job["_id"]
+        try:
+            question = await advanced_questions.get_by_id(job["question"])
+            if question is None:
+                if job["status"] == "done":
+                    await grading_jobs.mark_progress_applied(job_id, worker_id)
+                    await progress.forget_job(job["user"], job_id)
+                else:
+                    await grading_jobs.release(job_id, worker_id, "Question not found", failed=True)
+                    self._announce(job_id)
+                return
+
+            # Graded first and credited second, so a worker lost in between
+            # leaves a done job that is claimed again only to apply the score;
+            # the credit itself is keyed by job id, so a retry never adds it twice
+            if job["status"] != "done":
+                # Jobs can wait for the grader to recover, so no estimated scores
+                parsed_response = await grade_answer(question, job["user_answer"], allow_degraded=False)
+                job["score"] = parsed_response.get("score", 0)
+                response_text = parsed_response.get("response", "No response provided.")
+                if not await grading_jobs.complete(job_id, worker_id, job["score"], response_text):
+                    return
+                self._announce(job_id)
+
+            await progress.add_job_score(job["user"], job_id, {question["culture"]: job["score"]})
+            await grading_jobs.mark_progress_applied(job_id, worker_id)
+            await progress.forget_job(job["user"], job_id)
+        except asyncio.CancelledError:
+            # Shutting down: hand the job back instead of waiting out the lease
+            await asyncio.shield(grading_jobs.release(job_id, worker_id, None, failed=False, count_attempt=False))
+            raise
+        except (GradingOverloaded, GraderUnavailable) as e:
+            await grading_jobs.release(job_id, worker_id, None, failed=False, count_attempt=False)
+            await asyncio.sleep(max(self.poll_seconds, e.retry_after))
+        except Exception as e:
+            failed = job["attempts"] >= self.max_attempts
+            await grading_jobs.release(job_id, worker_id, f"{type(e).__name__}: {e}", failed=failed)
+            if failed:
+                self._announce(job_id)
+
+grading_workers = GradingWorkerPool(
+    GRADING_JOB_WORKERS, GRADING_JOB_LEASE_SECONDS, GRADING_JOB_MAX_ATTEMPTS, GRADING_JOB_POLL_SECONDS
+)
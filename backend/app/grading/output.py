@@ -0,0 +1,88 @@
+import re
+import json
+
+_FENCE = re.compile(r"^```(?:json)?\s*|\s*```$")
+_SCORE = re.compile(r'"?score"?\s*:\s*"?(-?\d+(?:\.\d+)?)')
+# The closing quote is optional so a reply cut off by the token cap still yields its feedback
+_RESPONSE = re.compile(r'"response"\s*:\s*"((?:[^"\\]|\\.)*)"?', re.DOTALL)
+
+DEFAULT_FEEDBACK = "No response provided."
+
+class InvalidGradeOutput(ValueError):
+    """Raised when a grading reply cannot be turned into a score."""
+
+def clamp_score(score):
+    """Round a numeric score and clamp it to 0-100."""
+    return max(0, min(100, round(score)))
+
+def validate_grade(data):
+    """Return ``{"score", "response"}`` from a decoded reply, or None if it does not fit.
+
+    The score may arrive as a number or numeric string and is clamped to 0-100.
+    """
+    if not isinstance(data, dict):
+        return None
+    score = data.get("score")
+    if isinstance(score, bool):
+        return None
+    if isinstance(score, str):
+        try:
+            score = float(score.strip())
+        except ValueError:
+            return None
+    if not isinstance(score, (int, float)):
+        return None
+    response = data.get("response")
+    if not isinstance(response, str) or not response.strip():
+        response = DEFAULT_FEEDBACK
+    return {"score": clamp_score(score), "response": response.strip()}
+
+def _decode_string(raw):
+    # Drop a dangling escape left by truncation before decoding
+    if raw.endswith("\\") and not raw.endswith("\\\\"):
+        raw = raw[:-1]
+    try:
+        return json.loads(f'"{raw}"')
+    except json.JSONDecodeError:
+        return raw
+
+def repair_grade(content):
+    """Recover a grade from a reply that is not clean JSON.
+
+    Handles code fences, text around the object and replies truncated by the
+    output token cap. Returns None when no score can be found.
+    """
+    text = _FENCE.sub("", content.strip())
+    start, end = text.find("{"), text.rfind("}")
+    if start != -1 and end > start:
+        try:
+            grade = validate_grade(json.loads(text[start:end + 1]))
+        except json.JSONDecodeError:
+            grade = None
+        if grade is not None:
+            return grade
+
+    score = _SCORE.search(text)
+    if score is None:
+        return None
+    response = _RESPONSE.search(text)
+    return validate_grade({
+        "score": score.group(1),
+        "response": _decode_string(response.group(1)) if response else None,
+    })
+
+def parse_grade(content):
+    """Parse a grading reply into ``({"score", "response"}, repaired)``.
+
+    Raises ``InvalidGradeOutput`` when nothing usable can be recovered.
+    """
+    try:
+        grade = validate_grade(json.loads(content))
+    except (json.JSONDecodeError, TypeError):
+        grade = None
+    if grade is not None:
+        return grade, False
+    grade = repair_grade(content or "")
+    if grade is None:
+        raise InvalidGradeOutput(f"Grader reply has no usable score: {(content or '')[:200]!r}")
+    return grade, True
@@ -0,0 +1,154 @@
+import os
+import re
+import math
+import time
+from collections import Counter
+from ..repositories import advanced_questions
+from ..metrics import PRESCORE_DECISIONS
+
+PRESCORE_ENABLED = os.getenv("PRESCORE_ENABLED", "true").lower() == "true"
+# Cosine similarity to the correct answer at or above which an answer is accepted locally
+PRESCORE_ACCEPT_SIMILARITY = float(os.getenv("PRESCORE_ACCEPT_SIMILARITY", "0.85"))
+# Similarity at or below which an answer is rejected locally
+PRESCORE_REJECT_SIMILARITY = float(os.getenv("PRESCORE_REJECT_SIMILARITY", "0.05"))
+# Answers with fewer content words than this are never accepted locally, only
+# rejected when they are also unrelated
+PRESCORE_MIN_WORDS = int(os.getenv("PRESCORE_MIN_WORDS", "3"))
+# How often the IDF table is rebuilt from the advanced question catalog
+PRESCORE_REFRESH_SECONDS = int(os.getenv("PRESCORE_REFRESH_SECONDS", "300"))
+
+ACCEPT_SCORE = 100
+REJECT_SCORE = 0
+# The stored correct answer is never quoted back: pasting it into a new
+# answer would be accepted locally at full score
+ACCEPT_FEEDBACK = "Excellent - your answer covers the expected points."
+REJECT_FEEDBACK = (
+    "Your answer does not address the question yet. Think about what is expected "
+    "in this situation and why, and try again."
+)
+DEGRADED_FEEDBACK = (
+    "Detailed feedback is temporarily unavailable, so this score is an estimate of how closely "
+    "your answer matches the expected points and has not been added to your progress."
+)
+
+_WORD = re.compile(r"[a-z0-9]+")
+# Negation flips an answer's meaning without changing its words much
+_NEGATION = re.compile(r"\b(?:not|no|never|nor|neither|none|nothing|nobody|nowhere|without|cannot)\b|n['’]t\b")
+STOP_WORDS = frozenset("""
+a an and are as at be been but by can do does for from has have how in is it its of on or
+so that the their them they this to was were what when where which who why will with you your
+""".split())
+
+def tokenize(text):
+    """Lower-cased content words with a light plural/suffix fold."""
+    words = []
+    for word in _WORD.findall(text.casefold()):
+        if word in STOP_WORDS:
+            continue
+        if len(word) > 4 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        words.append(word)
+    return words
+
+def negations(text):
+    """The negation words in ``text``, with ``n't`` and ``cannot`` folded into ``not``."""
+    found = set()
+    for match in _NEGATION.findall(text.casefold()):
+        found.add("not" if match in ("cannot", "n't", "n’t") else match)
+    return found
+
+class PreScorer:
+    """Resolves clear-cut advanced answers without calling the LLM.
+
+    Answers are compared with the stored correct answer by TF-IDF cosine
+    similarity. The IDF table comes from every advanced question's correct
+    answer, and each question's vector is computed once and kept until the
+    table is rebuilt. Near-verbatim answers are accepted, empty or unrelated
+    ones are rejected, and everything in between is escalated. Answers that
+    are short or add a negation the correct answer lacks are never accepted
+    locally, since a bag of words cannot tell "do" from "do not".
+    """
+
+    def __init__(self, accept, reject, min_words, refresh_seconds):
+        self.accept = accept
+        self.reject = reject
+        self.min_words = min_words
+        self.refresh_seconds = refresh_seconds
+        self._idf = {}
+        self._default_idf = 1.0
+        self._vectors = {}
+        self._loaded_at = None
+
+    async def refresh(self):
+        """Rebuild the IDF table and question vectors if they are older than ``refresh_seconds``."""
+        now = time.monotonic()
+        if self._loaded_at is not None and now - self._loaded_at < self.refresh_seconds:
+            return
+        answers = await advanced_questions.list_correct_answers()
+        document_frequency = Counter()
+        for answer in answers.values():
+            document_frequency.update(set(tokenize(answer)))
+        count = len(answers)
+        # Smoothed IDF; unseen words get the weight of a word in no document
+        self._idf = {word: math.log((1 + count) / (1 + df)) + 1 for word, df in document_frequency.items()}
+        self._default_idf = math.log(1 + count) + 1
+        self._vectors = {question_id: self._vector(tokenize(answer)) for question_id, answer in answers.items()}
+        self._loaded_at = now
+
+    def _vector(self, words):
+        counts = Counter(words)
+        vector = {word: (1 + math.log(tf)) * self._idf.get(word, self._default_idf) for word, tf in counts.items()}
+        norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+        return {word: weight / norm for word, weight in vector.items()} if norm else {}
+
+    def _question_vector(self, question):
+        question_id = str(question["_id"])
+        vector = self._vectors.get(question_id)
+        if vector is None:
+            vector = self._vector(tokenize(question["correct_answer"]))
+            self._vectors[question_id] = vector
+        return vector
+
+    def similarity(self, question, words):
+        """Cosine similarity between tokenized answer ``words`` and the question's correct answer."""
+        smaller, larger = sorted((self._question_vector(question), self._vector(words)), key=len)
+        return sum(weight * larger.get(word, 0.0) for word, weight in smaller.items())
+
+    async def score(self, question, user_answer):
+        """Return a templated grading result, or ``None`` to escalate to the LLM."""
+        words = tokenize(user_answer)
+        await self.refresh()
+        similarity = self.similarity(question, words) if words else 0.0
+        if similarity <= self.reject:
+            return self._resolve("rejected", REJECT_SCORE, REJECT_FEEDBACK)
+        if (
+            similarity >= self.accept
+            and len(words) >= self.min_words
+            and negations(user_answer) <= negations(question["correct_answer"])
+        ):
+            return self._resolve("accepted", ACCEPT_SCORE, ACCEPT_FEEDBACK)
+
+        PRESCORE_DECISIONS.labels("escalated").inc()
+        return None
+
+    async def estimate(self, question, user_answer):
+        """Score an answer from its similarity alone, for when the LLM cannot be reached."""
+        await self.refresh()
+        similarity = self.similarity(question, tokenize(user_answer))
+        score = round(100 * min(1.0, similarity / self.accept)) if self.accept > 0 else 0
+        return {
+            "score": score,
+            "response": DEGRADED_FEEDBACK,
+            "degraded": True,
+        }
+
+    def _resolve(self, outcome, score, feedback):
+        PRESCORE_DECISIONS.labels(outcome).inc()
+        return {"score": score, "response": feedback}
+
+    def invalidate(self):
+        self._loaded_at = None
+
+prescorer = PreScorer(
+    PRESCORE_ACCEPT_SIMILARITY, PRESCORE_REJECT_SIMILARITY, PRESCORE_MIN_WORDS, PRESCORE_REFRESH_SECONDS
+)
@@ -0,0 +1,253 @@
+import os
+import math
+import time
+import random
+import asyncio
+import httpx
+import openai
+from ..metrics import GRADER_BREAKER_STATE, LLM_ERRORS, LLM_HEDGES, LLM_RETRIES
+
+# Deadline for one LLM attempt; for streams, the longest gap between chunks (0 disables)
+GRADING_CALL_TIMEOUT_SECONDS = float(os.getenv("GRADING_CALL_TIMEOUT_SECONDS", "20"))
+# Extra attempts after a timeout, connection error, 429 or 5xx
+GRADING_RETRY_ATTEMPTS = int(os.getenv("GRADING_RETRY_ATTEMPTS", "2"))
+GRADING_RETRY_BASE_DELAY_SECONDS = float(os.getenv("GRADING_RETRY_BASE_DELAY_SECONDS", "0.5"))
+GRADING_RETRY_MAX_DELAY_SECONDS = float(os.getenv("GRADING_RETRY_MAX_DELAY_SECONDS", "8"))
+# Send a second, identical request if the first has not answered after this long (0 disables)
+GRADING_HEDGE_AFTER_SECONDS = float(os.getenv("GRADING_HEDGE_AFTER_SECONDS", "0"))
+# Consecutive failed calls that open the breaker (0 disables), and how long it stays open
+GRADING_BREAKER_FAILURES = int(os.getenv("GRADING_BREAKER_FAILURES", "5"))
+GRADING_BREAKER_RESET_SECONDS = float(os.getenv("GRADING_BREAKER_RESET_SECONDS", "30"))
+
+# Errors worth another attempt; anything else means the provider answered and said no
+RETRYABLE_ERRORS = (
+    asyncio.TimeoutError,
+    httpx.TransportError,
+    openai.APIConnectionError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+)
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+BREAKER_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+class GraderUnavailable(Exception):
+    """Raised when the LLM is failing or the circuit breaker is open."""
+
+    def __init__(self, retry_after):
+        super().__init__("The grader is temporarily unavailable")
+        self.retry_after = retry_after
+
+class CircuitBreaker:
+    """Stops calling the LLM after ``failure_threshold`` consecutive failed calls.
+
+    While open, calls fail fast for ``reset_seconds``. Then a single trial
+    call is let through (half-open) and its outcome closes or re-opens the
+    breaker.
+    """
+
+    def __init__(self, failure_threshold, reset_seconds):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        GRADER_BREAKER_STATE.set(BREAKER_STATE_VALUES[CLOSED])
+
+    @property
+    def state(self):
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_seconds:
+            self._set_state(HALF_OPEN)
+        return self._state
+
+    def _set_state(self, state):
+        if state != self._state:
+            print(f"Grader circuit breaker {self._state} -> {state}")
+        self._state = state
+        GRADER_BREAKER_STATE.set(BREAKER_STATE_VALUES[state])
+
+    def retry_after(self):
+        """Whole seconds until the breaker lets a call through again."""
+        if self._state != OPEN:
+            return 1
+        return max(1, math.ceil(self.reset_seconds - (time.monotonic() - self._opened_at)))
+
+    def check(self):
+        """Raise ``GraderUnavailable`` if a call would be refused right now."""
+        state = self.state
+        if state == OPEN or (state == HALF_OPEN and self._trial_in_flight):
+            raise GraderUnavailable(self.retry_after())
+
+    def before_call(self):
+        self.check()
+        if self._state == HALF_OPEN:
+            self._trial_in_flight = True
+
+    def record_success(self):
+        self._failures = 0
+        self._trial_in_flight = False
+        self._set_state(CLOSED)
+
+    def record_failure(self):
+        self._failures += 1
+        self._trial_in_flight = False
+        if self.failure_threshold > 0 and (self._state == HALF_OPEN or self._failures >= self.failure_threshold):
+            self._opened_at = time.monotonic()
+            self._set_state(OPEN)
+
+    def release(self):
+        """Forget an abandoned (cancelled) call without judging the provider."""
+        self._trial_in_flight = False
+
+    def stats(self):
+        return {"state": self.state, "consecutive_failures": self._failures}
+
+def _retry_after_header(error):
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+class ResiliencePolicy:
+    """Deadlines, retries with jittered backoff, hedging and a circuit breaker for LLM calls.
+
+    Calls are passed as factories (``lambda: backend.complete(...)``) so each
+    attempt starts a fresh request. When retries run out on transient errors,
+    or the breaker is open, ``GraderUnavailable`` is raised; other errors
+    propagate unchanged.
+    """
+
+    def __init__(self, breaker, timeout, retries, base_delay, max_delay, hedge_after):
+        self.breaker = breaker
+        self.timeout = timeout
+        self.retries = retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedge_after = hedge_after
+
+    def check(self):
+        self.breaker.check()
+
+    def backoff(self, attempt, error=None):
+        """Full-jitter exponential backoff, stretched to the provider's Retry-After up to the cap."""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        retry_after = _retry_after_header(error)
+        if retry_after:
+            delay = max(delay, min(retry_after, self.max_delay))
+        return delay
+
+    async def _attempt(self, make_call):
+        if self.timeout > 0:
+            return await asyncio.wait_for(make_call(), self.timeout)
+        return await make_call()
+
+    async def _hedged(self, make_call):
+        """Start a second attempt if the first is slow, and keep whichever succeeds first."""
+        tasks = [asyncio.create_task(self._attempt(make_call))]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.hedge_after)
+            if not done:
+                LLM_HEDGES.inc()
+                tasks.append(asyncio.create_task(self._attempt(make_call)))
+            pending = set(tasks)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def _failed(self, operation, error, attempt, retryable):
+        LLM_ERRORS.labels(operation, type(error).__name__).inc()
+        if not retryable:
+            # The provider answered, so as far as the breaker is concerned it is up
+            self.breaker.record_success()
+            return False
+        if attempt < self.retries:
+            LLM_RETRIES.labels(operation).inc()
+            return True
+        self.breaker.record_failure()
+        raise GraderUnavailable(self.breaker.retry_after()) from error
+
+    async def call(self, make_call, operation):
+        """Await ``make_call()`` under the policy and return its result."""
+        self.breaker.before_call()
+        for attempt in range(self.retries + 1):
+            try:
+                if self.hedge_after > 0:
+                    result = await self._hedged(make_call)
+                else:
+                    result = await self._attempt(make_call)
+            except RETRYABLE_ERRORS as e:
+                self._failed(operation, e, attempt, retryable=True)
+                await asyncio.sleep(self.backoff(attempt, e))
+                continue
+            except asyncio.CancelledError:
+                self.breaker.release()
+                raise
+            except Exception as e:
+                self._failed(operation, e, attempt, retryable=False)
+                raise
+            self.breaker.record_success()
+            return result
+
+    async def stream(self, open_stream, operation):
+        """Yield from ``open_stream()`` under the policy.
+
+        The deadline applies to each gap between chunks. Only attempts that
+        fail before the first chunk are retried; later errors propagate as is.
+        Streams are never hedged.
+        """
+        self.breaker.before_call()
+        for attempt in range(self.retries + 1):
+            started = False
+            stream = open_stream()
+            try:
+                while True:
+                    try:
+                        if self.timeout > 0:
+                            delta = await asyncio.wait_for(anext(stream), self.timeout)
+                        else:
+                            delta = await anext(stream)
+                    except StopAsyncIteration:
+                        break
+                    started = True
+                    yield delta
+            except RETRYABLE_ERRORS as e:
+                if started:
+                    LLM_ERRORS.labels(operation, type(e).__name__).inc()
+                    self.breaker.record_failure()
+                    raise
+                self._failed(operation, e, attempt, retryable=True)
+                await asyncio.sleep(self.backoff(attempt, e))
+                continue
+            except (asyncio.CancelledError, GeneratorExit):
+                self.breaker.release()
+                raise
+            except Exception as e:
+                self._failed(operation, e, attempt, retryable=False)
+                raise
+            finally:
+                await stream.aclose()
+            self.breaker.record_success()
+            return
+
+resilience = ResiliencePolicy(
+    CircuitBreaker(GRADING_BREAKER_FAILURES, GRADING_BREAKER_RESET_SECONDS),
+    GRADING_CALL_TIMEOUT_SECONDS,
+    GRADING_RETRY_ATTEMPTS,
+    GRADING_RETRY_BASE_DELAY_SECONDS,
+    GRADING_RETRY_MAX_DELAY_SECONDS,
+    GRADING_HEDGE_AFTER_SECONDS,
+)
@@ -0,0 +1,68 @@
+import re
+import json
+from .output import clamp_score
+
+_SCORE = re.compile(r'"score"\s*:\s*(-?\d+(?:\.\d+)?)\s*[,}\s]')
+_RESPONSE_START = re.compile(r'"response"\s*:\s*"')
+
+class GradeStreamParser:
+    """Incrementally pull the score and feedback out of a streamed JSON reply.
+
+    The model is asked for ``{"score": ..., "response": "..."}``; as chunks
+    arrive, ``feed`` returns ``("score", int)`` once the number is complete,
+    clamped to 0-100 as the final parse does, and ``("feedback", str)`` for
+    each newly decoded piece of the response string.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.score = None
+        self.feedback = ""
+        self._position = None
+        self._finished = False
+
+    def feed(self, chunk):
+        self.buffer += chunk
+        events = []
+
+        if self.score is None:
+            match = _SCORE.search(self.buffer)
+            if match:
+                self.score = clamp_score(float(match.group(1)))
+                events.append(("score", self.score))
+
+        if self._position is None:
+            match = _RESPONSE_START.search(self.buffer)
+            if match:
+                self._position = match.end()
+
+        if self._position is not None and not self._finished:
+            text = self._decode_available()
+            if text:
+                self.feedback += text
+                events.append(("feedback", text))
+
+        return events
+
+    def _decode_available(self):
+        pieces = []
+        position = self._position
+        buffer = self.buffer
+        while position < len(buffer):
+            char = buffer[position]
+            if char == '"':
+                self._finished = True
+                position += 1
+                break
+            if char == "\\":
+                # Wait for the rest of an escape sequence before decoding it
+                length = 6 if buffer[position + 1:position + 2] == "u" else 2
+                if position + length > len(buffer):
+                    break
+                pieces.append(json.loads(f'"{buffer[position:position + length]}"'))
+                position += length
+                continue
+            pieces.append(char)
+            position += 1
+        self._position = position
+        return "".join(pieces)
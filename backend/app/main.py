@@ -1,24 +1,38 @@
 import json
-from fastapi import FastAPI, Depends, HTTPException, status
+import math
+import time
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Depends, HTTPException, Header, Query, Request, Response, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from datetime import datetime, timedelta
 from typing import Optional, List
+from enum import Enum
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from pydantic import BaseModel, Field, ConfigDict
 from bson import ObjectId
-from .models import AdvancedQuestion, User, Question, UserProgress
-from .database import connect_db
+from .database import MONGO_MIN_POOL_SIZE, close_async_db, ensure_indexes, ping, warm_pool
+from .models import INDEXED_MODELS
+from .responses import MongoJSONResponse, dumps
+from .repositories import users, questions, advanced_questions, leaderboard, grading_jobs, progress as progress_repo
+from .repositories.base import to_object_id
+from .catalog import catalog_cache, etag_matches
+from .catalog_io import CatalogRecordError, aiter_lines, export_line
+from .principals import principal_cache, make_principal
+from . import passwords
+from .grading.backends import get_backend, close_backend
+from .grading.grader import grade_answer, grade_answers, stream_grade
+from .grading.output import InvalidGradeOutput
+from .grading.resilience import GraderUnavailable, resilience
+from .grading.prescore import prescorer
+from .grading.admission import GradingOverloaded, user_rate_limiter
+from .grading.jobs import FINISHED_STATUSES, grading_workers
+from .grading.cache import grading_cache
+from .metrics import REGISTRY, MetricsMiddleware, cache_collector
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 import os
-from dotenv import load_dotenv
-from openai import OpenAI
-
-# Load environment variables
-load_dotenv()
-
-# Initialize database connection
-connect_db()
 
 # Security configuration
 SECRET_KEY = os.getenv("JWT_SECRET")
@@ -26,59 +40,47 @@ if not SECRET_KEY:
     raise ValueError("JWT_SECRET environment variable is not set")
 
 REFRESH_SECRET_KEY = os.getenv("JWT_SECRET")
-OPEN_AI_API_KEY = os.getenv("OPEN_AI_API_KEY")
-OPEN_AI_MODEL = os.getenv("OPEN_AI_MODEL")
-
-OPEN_AI_TEMPLATE = """
-You are a helpful assistant to teach about cultures based on a given question, culture, and a response.
-Your response to the user should be personal, refer to the user as "you" or "your" and not "the user".
-Given the question, best answer, and the user's answer, you need to determine how closely the user's answer matches the best answer, and then return a score between 0 and 100.
-Make sure your response references the culture of the question, and not being ambiguous such as "many cultures".
-
-**VERY IMPORTANT**:
-- DO NOT MENTION THE WRONG CULTURE IN YOUR RESPONSE.
-- DO NOT MENTION THE WRONG CULTURE IN YOUR RESPONSE.
-- DO NOT MENTION THE WRONG CULTURE IN YOUR RESPONSE.
-
-**Scoring Criteria**:
-- Relevance: How closely does the user's answer relate to the question?
-- Accuracy: Is the information provided in the user's answer correct?
-- Completeness: Does the user's answer cover all necessary aspects of the best answer in a literal sense?
-
-**Examples**:
-- You may randomly choose a score between 0 and 100 based on the following thresholds:
-- A perfect answer that matches the best answer exactly: score 100
-- A partially correct answer that misses some key points: score between 70 and 99
-- A answer that is not exactly correct but is close: score between 50 and 69
-- You may choose how to score for scores under 50, but it should be based on how close the answer is to the best answer.
-- An answer that is completely off-topic: score 0
-
-**Handling Edge Cases**:
-If the user's answer is ambiguous or unclear, provide a score reflecting the uncertainty.
-However, if the user's answer is matching the best answer but is not exactly the same, provide a score of 99.
-
-Make sure to not deviate from the question and the best answer. Do not add any other text or information to the response, only the score and the response.
-Make sure not to provide additional criticism outside of the scoring criteria, such as the user's tone or the way they phrased their answer or how they may have said it.
-Don't be too harsh in your feedback and don't be too vague.
-Keep your response concise and to the point, and don't be too long.
-Make sure you actually refer to the culture of the question, and not some other culture.
-Don't deviate from the culture of the question, and don't be too general in your response.
-
-You need to return the answer in a JSON format. The JSON format should be like this:
-{
-    "score": 0,
-    "response": "Your own feedback as the model on the answer"
-}
-"""
 
 ALGORITHM = "HS256"
+MAX_BATCH_ANSWERS = int(os.getenv("MAX_BATCH_ANSWERS", "50"))
+MAX_QUESTIONS_PAGE_SIZE = int(os.getenv("MAX_QUESTIONS_PAGE_SIZE", "100"))
+MAX_LEADERBOARD_SIZE = int(os.getenv("MAX_LEADERBOARD_SIZE", "100"))
+CATALOG_IO_BATCH_SIZE = int(os.getenv("CATALOG_IO_BATCH_SIZE", "500"))
+STARTUP_ENSURE_INDEXES = os.getenv("STARTUP_ENSURE_INDEXES", "true").lower() == "true"
+STARTUP_WARM_CACHES = os.getenv("STARTUP_WARM_CACHES", "true").lower() == "true"
+HEALTH_CHECK_TIMEOUT_SECONDS = float(os.getenv("HEALTH_CHECK_TIMEOUT_SECONDS", "2"))
+GRADING_JOB_MAX_WAIT_SECONDS = float(os.getenv("GRADING_JOB_MAX_WAIT_SECONDS", "30"))
 ACCESS_TOKEN_EXPIRE_MINUTES = 120
 REFRESH_TOKEN_EXPIRE_DAYS = 7
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-app = FastAPI(title="Mannerisms API")
+@asynccontextmanager
+async def lifespan(app):
+    """Connect, prepare the database and warm caches before serving traffic."""
+    started = time.perf_counter()
+    get_backend()
+    await warm_pool(MONGO_MIN_POOL_SIZE)
+    if STARTUP_ENSURE_INDEXES:
+        app.state.index_conflicts = await ensure_indexes(INDEXED_MODELS)
+    if STARTUP_WARM_CACHES:
+        await warm_catalog()
+        await prescorer.refresh()
+    grading_workers.start()
+    app.state.ready = True
+    print(f"Startup complete in {time.perf_counter() - started:.2f}s")
+
+    yield
+
+    app.state.ready = False
+    await grading_workers.stop()
+    await close_backend()
+    passwords.shutdown()
+    close_async_db()
+
+app = FastAPI(title="Mannerisms API", default_response_class=MongoJSONResponse, lifespan=lifespan)
+app.state.ready = False
+app.state.index_conflicts = []
 
 # CORS configuration
 app.add_middleware(
@@ -87,7 +89,13 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor"],
 )
+app.add_middleware(MetricsMiddleware)
+
+cache_collector.register("grading", grading_cache)
+cache_collector.register("catalog", catalog_cache)
+cache_collector.register("principal", principal_cache)
 
 # Pydantic models
 class PyObjectId(str):
@@ -113,6 +121,8 @@ class Token(BaseModel):
 
 class TokenData(BaseModel):
     username: Optional[str] = None
+    user_id: Optional[str] = None
+    token_version: int = 0
 
 class RefreshToken(BaseModel):
     refresh_token: str
@@ -150,6 +160,9 @@ class QuestionResponse(BaseModel):
 
     model_config = ConfigDict(populate_by_name=True)
 
+QUESTION_FIELDS = set(QuestionResponse.model_fields) - {"id"}
+USER_PROFILE_FIELDS = [field for field in UserResponse.model_fields if field != "id"]
+
 class UserProgressResponse(BaseModel):
     id: PyObjectId = Field(default_factory=PyObjectId, alias="_id")
     user: UserResponse
@@ -171,6 +184,47 @@ class OpenAIRequest(BaseModel):
 class OpenAIResponse(BaseModel):
     score: int = Field(..., description="The score from the OpenAI API")
     response: str = Field(..., description="The response from the OpenAI API")
+    degraded: bool = Field(False, description="True when the score is a local estimate because the grader is unavailable")
+
+class BatchAnswerItem(BaseModel):
+    question_id: str = Field(..., description="The id of the advanced question")
+    user_answer: str = Field(..., description="The user's answer to the question")
+
+class BatchAnswerSubmission(BaseModel):
+    answers: List[BatchAnswerItem] = Field(..., description="The answers to grade")
+
+class BatchAnswerResult(BaseModel):
+    question_id: str = Field(..., description="The id of the graded question")
+    score: Optional[int] = Field(None, description="The score, or null if grading this answer failed")
+    response: Optional[str] = Field(None, description="The feedback, or null if grading this answer failed")
+    degraded: bool = Field(False, description="True when the score is a local estimate because the grader is unavailable")
+    error: Optional[str] = Field(None, description="Why this answer could not be graded; it can be resubmitted")
+
+class GradingJobResponse(BaseModel):
+    job_id: str
+    status: str = Field(..., description="pending, running, done or failed")
+    score: Optional[int] = Field(None, description="Set once the job is done")
+    response: Optional[str] = Field(None, description="Feedback, set once the job is done")
+    error: Optional[str] = Field(None, description="Why the job failed")
+
+class LeaderboardEntryResponse(BaseModel):
+    rank: int = Field(..., description="Position on the leaderboard; tied scores share a rank")
+    username: str
+    score: int
+
+class LeaderboardRankResponse(BaseModel):
+    rank: Optional[int] = Field(None, description="The user's rank, or null if they have no score yet")
+    score: int
+    total: int = Field(..., description="Number of ranked users")
+
+class CatalogCollection(str, Enum):
+    questions = "questions"
+    advanced_questions = "advanced_questions"
+
+class CatalogImportResult(BaseModel):
+    written: int = Field(..., description="New or changed documents written")
+    unchanged: int = Field(..., description="Documents skipped because their content was unchanged")
+    removed: int = Field(..., description="Documents deleted because they were not in the upload (prune only)")
 
 class AdvancedQuestionResponse(BaseModel):
     id: PyObjectId = Field(default_factory=PyObjectId, alias="id")
@@ -179,11 +233,58 @@ class AdvancedQuestionResponse(BaseModel):
 
 
 # Security functions
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+async def verify_password(plain_password, hashed_password):
+    try:
+        return await passwords.verify_and_update(plain_password, hashed_password)
+    except passwords.PasswordHasherBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many login attempts in progress, please retry",
+            headers={"Retry-After": "1"},
+        )
+
+async def get_password_hash(password):
+    try:
+        return await passwords.hash_password(password)
+    except passwords.PasswordHasherBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many sign-ups in progress, please retry",
+            headers={"Retry-After": "1"},
+        )
+
+def check_grading_rate(user_id, cost=1):
+    retry_after = user_rate_limiter.take(str(user_id), cost)
+    if retry_after:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many answers submitted for grading, please slow down",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
+
+def grading_overloaded(e):
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Grading is at capacity, please retry",
+        headers={"Retry-After": str(e.retry_after)},
+    )
+
+def grader_unavailable(e):
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="The grader is temporarily unavailable, please retry",
+        headers={"Retry-After": str(e.retry_after)},
+    )
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
+def grading_error(e):
+    """Map an exception raised while grading to the HTTP error the endpoints return."""
+    if isinstance(e, GradingOverloaded):
+        return grading_overloaded(e)
+    if isinstance(e, InvalidGradeOutput):
+        return HTTPException(status_code=502, detail="The grader returned a response without a usable score.")
+    if isinstance(e, GraderUnavailable):
+        return grader_unavailable(e)
+    return HTTPException(status_code=500, detail=f"Error calling OpenAI API: {str(e)}")
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -202,7 +303,34 @@ def create_refresh_token(data: dict):
     encoded_jwt = jwt.encode(to_encode, REFRESH_SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme)):
+def token_claims(user):
+    return {
+        "sub": user["username"],
+        "uid": str(user["_id"]),
+        "ver": user.get("token_version", 0),
+    }
+
+async def resolve_principal(token_data: TokenData):
+    """Return the principal for verified token claims, or None if revoked.
+
+    Tokens carry the user id and token version, so a cached principal
+    answers without touching the users collection. Tokens issued before
+    those claims existed fall back to a lookup by username.
+    """
+    if token_data.user_id:
+        principal = principal_cache.get(token_data.user_id, token_data.token_version)
+        if principal is not None:
+            return principal
+        user = await users.get_by_id(token_data.user_id)
+    else:
+        user = await users.get_by_username(token_data.username)
+    if user is None or user.get("token_version", 0) != token_data.token_version:
+        return None
+    principal = make_principal(user)
+    principal_cache.set(principal)
+    return principal
+
+async def get_current_principal(token: str = Depends(oauth2_scheme)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -210,40 +338,68 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
     )
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        token_data = TokenData(username=username)
+        token_data = TokenData(
+            username=payload.get("sub"),
+            user_id=payload.get("uid"),
+            token_version=payload.get("ver", 0)
+        )
     except JWTError:
         raise credentials_exception
-    user = User.objects(username=token_data.username).first()
-    if user is None:
+    principal = await resolve_principal(token_data)
+    if principal is None:
         raise credentials_exception
+    return principal
+
+async def require_admin(principal: dict = Depends(get_current_principal)):
+    if not principal.get("is_admin"):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin privileges required")
+    return principal
+
+async def get_current_user(principal: dict = Depends(get_current_principal)):
+    """Load the user's public profile for handlers that need more than identity."""
+    user = await users.get_by_id(principal["_id"], fields=USER_PROFILE_FIELDS)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
     return user
 
 # Authentication endpoints
 @app.post("/token", response_model=Token)
 async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
-    user = User.objects(username=form_data.username).first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    user = await users.get_by_username(form_data.username)
+    is_valid, new_hash = False, None
+    if user:
+        is_valid, new_hash = await verify_password(form_data.password, user["hashed_password"])
+    if not user or not is_valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    if new_hash:
+        await users.update_password_hash(user["_id"], new_hash)
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
+        data=token_claims(user), expires_delta=access_token_expires
     )
-    refresh_token = create_refresh_token(data={"sub": user.username})
+    refresh_token = create_refresh_token(data=token_claims(user))
     return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
 
 @app.post("/refresh", response_model=Token)
 async def refresh_token(refresh_token: RefreshToken):
     try:
         payload = jwt.decode(refresh_token.refresh_token, REFRESH_SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
+        token_data = TokenData(
+            username=payload.get("sub"),
+            user_id=payload.get("uid"),
+            token_version=payload.get("ver", 0)
+        )
         
-        user = User.objects(username=username).first()
-        if user is None:
+        principal = await resolve_principal(token_data)
+        if principal is None:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="User not found"
@@ -251,9 +407,9 @@ async def refresh_token(refresh_token: RefreshToken):
 
         access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
         new_access_token = create_access_token(
-            data={"sub": user.username}, expires_delta=access_token_expires
+            data=token_claims(principal), expires_delta=access_token_expires
         )
-        new_refresh_token = create_refresh_token(data={"sub": user.username})
+        new_refresh_token = create_refresh_token(data=token_claims(principal))
         
         return {
             "access_token": new_access_token,
@@ -266,134 +422,409 @@ async def refresh_token(refresh_token: RefreshToken):
             detail="Invalid refresh token"
         )
 
+@app.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout_everywhere(current_user: dict = Depends(get_current_principal)):
+    """Revoke every access and refresh token issued to the current user."""
+    await users.bump_token_version(current_user["_id"])
+    principal_cache.invalidate(current_user["_id"])
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
 @app.post("/users/", response_model=UserResponse)
-def create_user(user: UserCreate):
-    db_user = User.objects(username=user.username).first()
+async def create_user(user: UserCreate):
+    db_user = await users.get_by_username(user.username)
     if db_user:
         raise HTTPException(status_code=400, detail="Username already registered")
-    hashed_password = get_password_hash(user.password)
-    db_user = User(
+    hashed_password = await get_password_hash(user.password)
+    db_user = await users.create(
         username=user.username,
         hashed_password=hashed_password
     )
-    db_user.save()
     return db_user
 
 # Question endpoints
+def question_page_key(culture, category, difficulty, after_id, limit, fields):
+    # An empty selection (ids only) must not share a key with no selection (every field)
+    selection = None if fields is None else tuple(fields)
+    return (culture or "", category or "", difficulty or "", str(after_id or ""), limit, selection)
+
+async def build_question_page(culture, category, difficulty, after_id, limit, fields):
+    """Return the encoded page body and the cursor of the next page, if any."""
+    # Stored documents already have the response shape; the projection
+    # drops internal fields, so they are encoded without re-validation
+    documents = await questions.list_questions(
+        culture, category, difficulty, after=after_id, limit=limit, fields=QUESTION_FIELDS if fields is None else fields
+    )
+    next_cursor = str(documents[-1]["_id"]) if limit and len(documents) == limit else None
+    return dumps(documents), next_cursor
+
+async def warm_catalog():
+    """Build the unfiltered and per-culture catalog pages ahead of the first request."""
+    for culture in [None] + await questions.list_cultures():
+        await catalog_cache.get(
+            question_page_key(culture, None, None, None, None, None),
+            lambda: build_question_page(culture, None, None, None, None, None)
+        )
+
 @app.get("/questions/", response_model=List[QuestionResponse])
-def get_questions(culture: Optional[str] = None):
-    if culture:
-        return list(Question.objects(culture=culture))
-    return list(Question.objects.all())
+async def get_questions(
+    culture: Optional[str] = None,
+    category: Optional[str] = None,
+    difficulty: Optional[str] = None,
+    after: Optional[str] = Query(default=None, description="Cursor from the previous page's X-Next-Cursor header"),
+    limit: Optional[int] = Query(default=None, ge=1, le=MAX_QUESTIONS_PAGE_SIZE),
+    fields: Optional[str] = Query(default=None, description="Comma-separated fields to return"),
+    if_none_match: Optional[str] = Header(default=None)
+):
+    after_id = None
+    if after:
+        after_id = to_object_id(after)
+        if after_id is None:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    selected_fields = None
+    if fields:
+        selected_fields = sorted({field.strip() for field in fields.split(",") if field.strip()} - {"id", "_id"})
+        unknown = set(selected_fields) - QUESTION_FIELDS
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+
+    body, etag, next_cursor = await catalog_cache.get(
+        question_page_key(culture, category, difficulty, after_id, limit, selected_fields),
+        lambda: build_question_page(culture, category, difficulty, after_id, limit, selected_fields)
+    )
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 @app.post("/questions/", response_model=QuestionResponse)
-def create_question(
+async def create_question(
     question: QuestionCreate,
-    current_user: User = Depends(get_current_user)
+    current_user: dict = Depends(get_current_principal)
 ):
-    db_question = Question(**question.dict())
-    db_question.save()
+    db_question = await questions.create(**question.dict())
+    await catalog_cache.bump_version()
     return db_question
 
 @app.post("/questions/{question_id}/answer")
 async def submit_answer(
     question_id: str,
     answer: AnswerSubmission,
-    current_user: User = Depends(get_current_user)
+    current_user: dict = Depends(get_current_principal)
 ):
-    question = Question.objects(id=question_id).first()
+    question = await questions.get_by_id(question_id)
     if not question:
         raise HTTPException(status_code=404, detail="Question not found")
     
-    is_correct = answer.user_answer == question.correct_answer
-    
-    progress = UserProgress.objects(user=current_user).first()
-    
-    if not progress:
-        progress = UserProgress(user=current_user)
+    is_correct = answer.user_answer == question["correct_answer"]
     
     if is_correct:
-        if question.tag not in progress.completed_questions:
-            progress.score += 1
-            progress.completed_questions.append(question.tag)
-    
-    progress.last_activity = datetime.utcnow()
-    progress.save()
+        await progress_repo.complete_question(current_user["_id"], question["tag"], question["culture"])
+    else:
+        await progress_repo.touch(current_user["_id"])
     
     return {
         "correct": is_correct,
-        "explanation": question.explanation
+        "explanation": question["explanation"]
     }
 
 # Progress endpoints
 @app.get("/progress/", response_model=UserProgressResponse)
-def get_user_progress(current_user: User = Depends(get_current_user)):
-    progress = UserProgress.objects(user=current_user).first()
-    
-    if not progress:
-        progress = UserProgress(user=current_user)
-        progress.save()
-    
-    return progress 
+async def get_user_progress(current_user: dict = Depends(get_current_user)):
+    progress = await progress_repo.get_or_create(current_user["_id"])
+
+    return MongoJSONResponse({
+        "_id": progress["_id"],
+        "user": current_user,
+        "score": progress["score"],
+        "completed_questions": progress["completed_questions"],
+        "last_activity": progress["last_activity"],
+    })
+
+# Health endpoint
+@app.get("/health", include_in_schema=False)
+async def health():
+    """Ready once startup has finished and while MongoDB answers a ping.
+
+    The grader's circuit breaker is reported but does not fail the check:
+    grading degrades on its own and every other endpoint keeps working. A
+    unique index that could not be created at startup does fail it, because
+    duplicate users, tags or completions could then be written.
+    """
+    try:
+        await asyncio.wait_for(ping(), HEALTH_CHECK_TIMEOUT_SECONDS)
+        mongo = "ok"
+    except Exception as e:
+        mongo = f"error: {type(e).__name__}"
+    indexes = "ok" if not app.state.index_conflicts else f"not unique: {', '.join(app.state.index_conflicts)}"
+    healthy = app.state.ready and mongo == "ok" and indexes == "ok"
+    return MongoJSONResponse(
+        {"status": "ok" if healthy else "unavailable", "ready": app.state.ready, "mongo": mongo, "indexes": indexes, "grader": resilience.breaker.state},
+        status_code=status.HTTP_200_OK if healthy else status.HTTP_503_SERVICE_UNAVAILABLE
+    )
+
+# Metrics endpoint
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return Response(content=generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
+
+# Admin endpoints
+CATALOG_REPOSITORIES = {
+    CatalogCollection.questions: questions,
+    CatalogCollection.advanced_questions: advanced_questions,
+}
+
+@app.get("/admin/catalog/{collection}/export")
+async def export_catalog(
+    collection: CatalogCollection,
+    current_user: dict = Depends(require_admin)
+):
+    cursor = CATALOG_REPOSITORIES[collection].export_cursor(CATALOG_IO_BATCH_SIZE)
+
+    async def lines():
+        async for document in cursor:
+            yield export_line(document)
+
+    return StreamingResponse(
+        lines(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{collection.value}.ndjson"'}
+    )
+
+@app.post("/admin/catalog/{collection}/import", response_model=CatalogImportResult)
+async def import_catalog(
+    collection: CatalogCollection,
+    request: Request,
+    prune: bool = Query(default=False, description="Delete documents whose tags are not in the upload"),
+    current_user: dict = Depends(require_admin)
+):
+    try:
+        written, unchanged, removed = await CATALOG_REPOSITORIES[collection].import_records(
+            aiter_lines(request.stream()), CATALOG_IO_BATCH_SIZE, prune=prune
+        )
+    except CatalogRecordError as e:
+        # Earlier batches may already be written
+        await catalog_cache.bump_version()
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if written or removed:
+        await catalog_cache.bump_version()
+        if collection == CatalogCollection.advanced_questions:
+            prescorer.invalidate()
+    return {"written": written, "unchanged": unchanged, "removed": removed}
+
+# Leaderboard endpoints
+@app.get("/leaderboard/", response_model=List[LeaderboardEntryResponse])
+async def get_leaderboard(
+    culture: Optional[str] = None,
+    limit: int = Query(default=10, ge=1, le=MAX_LEADERBOARD_SIZE),
+    current_user: dict = Depends(get_current_principal)
+):
+    entries = await leaderboard.top(culture or leaderboard.GLOBAL_SCOPE, limit)
+    usernames = await users.usernames_by_id(entry["user"] for entry in entries)
+    return [
+        {"rank": entry["rank"], "username": usernames.get(entry["user"], ""), "score": entry["score"]}
+        for entry in entries
+    ]
+
+@app.get("/leaderboard/me", response_model=LeaderboardRankResponse)
+async def get_my_rank(
+    culture: Optional[str] = None,
+    current_user: dict = Depends(get_current_principal)
+):
+    rank = await leaderboard.rank_of(culture or leaderboard.GLOBAL_SCOPE, current_user["_id"])
+    if rank is None:
+        total = await leaderboard.total(culture or leaderboard.GLOBAL_SCOPE)
+        return {"rank": None, "score": 0, "total": total}
+    return rank
 
 # Advanced endpoints
 @app.get("/advancedQuestion/", response_model=AdvancedQuestionResponse)
-def get_advanced_question(culture: str):
-    question = AdvancedQuestion.objects(culture=culture).first()
+async def get_advanced_question(culture: str):
+    question = await advanced_questions.get_by_culture(culture)
     if not question:
         raise HTTPException(status_code=404, detail="Question not found")
     return {
-        "question": question.question,
-        "id": question.id,
-        "culture": question.culture
+        "question": question["question"],
+        "id": question["_id"],
+        "culture": question["culture"]
     }
 
 @app.post("/advancedQuestion/{question_id}/answer/")
 async def submit_advanced_answer(
     question_id: str,
     answer: AnswerSubmission,
-    current_user: User = Depends(get_current_user)
+    current_user: dict = Depends(get_current_principal)
 ):
-    question = AdvancedQuestion.objects(id=question_id).first()
+    question = await advanced_questions.get_by_id(question_id)
     if not question:
         raise HTTPException(status_code=404, detail="Question not found")
+    check_grading_rate(current_user["_id"])
     
-    progress = UserProgress.objects(user=current_user).first()
-    if not progress:
-        progress = UserProgress(user=current_user)
-    
-    progress.last_activity = datetime.utcnow()
-    progress.save()
-
-    client = OpenAI(api_key=OPEN_AI_API_KEY)
-
     try:
-        response = client.chat.completions.create(
-            model=OPEN_AI_MODEL,
-            messages=[
-                {"role": "system", "content": OPEN_AI_TEMPLATE},
-                {"role": "user", "content": f"Question: {question.question}\nUser Answer: {answer.user_answer}\nCorrect Answer: {question.correct_answer}"}
-            ]
-        )
-
-        response_content = response.choices[0].message.content
-
-        parsed_response = json.loads(response_content)
+        parsed_response = await grade_answer(question, answer.user_answer)
 
         score = parsed_response.get("score", 0)
-        progress.score += score
-        progress.save()
+        degraded = parsed_response.get("degraded", False)
+        # Estimates from a degraded grader are shown but never credited
+        if not degraded:
+            await progress_repo.add_score(current_user["_id"], {question["culture"]: score})
         response_text = parsed_response.get("response", "No response provided.")
 
         print("Parsed response: ", parsed_response)
 
-        return OpenAIResponse(score=score, response=response_text)
+        return OpenAIResponse(score=score, response=response_text, degraded=degraded)
 
-    except json.JSONDecodeError:
-        raise HTTPException(status_code=500, detail="Error decoding JSON response from OpenAI API.")
+    except GradingOverloaded as e:
+        raise grading_overloaded(e)
+    except InvalidGradeOutput:
+        raise HTTPException(status_code=502, detail="The grader returned a response without a usable score.")
+    except GraderUnavailable as e:
+        raise grader_unavailable(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error calling OpenAI API: {str(e)}")
-    
+
+@app.post("/advancedQuestion/answers/", response_model=List[BatchAnswerResult])
+async def submit_advanced_answers(
+    submission: BatchAnswerSubmission,
+    current_user: dict = Depends(get_current_principal)
+):
+    if not submission.answers:
+        return []
+    if len(submission.answers) > MAX_BATCH_ANSWERS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_ANSWERS} answers can be graded at once")
+
+    questions_by_id = await advanced_questions.get_many([item.question_id for item in submission.answers])
+    missing = [item.question_id for item in submission.answers if item.question_id not in questions_by_id]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Questions not found: {', '.join(missing)}")
+    check_grading_rate(current_user["_id"], cost=len(submission.answers))
+
+    parsed_responses = await grade_answers(
+        [(questions_by_id[item.question_id], item.user_answer) for item in submission.answers]
+    )
+    errors = [r for r in parsed_responses if isinstance(r, Exception)]
+    # Nothing was graded, so answer with the error itself (and its Retry-After)
+    if len(errors) == len(parsed_responses):
+        raise grading_error(errors[0])
+
+    results = []
+    for item, parsed_response in zip(submission.answers, parsed_responses):
+        if isinstance(parsed_response, Exception):
+            print(f"Grading answer to {item.question_id} failed: {parsed_response!r}")
+            results.append(BatchAnswerResult(question_id=item.question_id, error=grading_error(parsed_response).detail))
+            continue
+        results.append(BatchAnswerResult(
+            question_id=item.question_id,
+            score=parsed_response.get("score", 0),
+            response=parsed_response.get("response", "No response provided."),
+            degraded=parsed_response.get("degraded", False),
+        ))
+    points_by_culture = {}
+    for result in results:
+        if result.error or result.degraded:
+            continue
+        culture = questions_by_id[result.question_id]["culture"]
+        points_by_culture[culture] = points_by_culture.get(culture, 0) + result.score
+    if points_by_culture:
+        await progress_repo.add_score(current_user["_id"], points_by_culture)
+
+    return results
+
+def _sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/advancedQuestion/{question_id}/answer/stream")
+async def stream_advanced_answer(
+    question_id: str,
+    answer: AnswerSubmission,
+    current_user: dict = Depends(get_current_principal)
+):
+    question = await advanced_questions.get_by_id(question_id)
+    if not question:
+        raise HTTPException(status_code=404, detail="Question not found")
+    check_grading_rate(current_user["_id"])
+
+    async def events():
+        try:
+            async for event, value in stream_grade(question, answer.user_answer):
+                if event == "score":
+                    yield _sse_event("score", {"score": value})
+                elif event == "feedback":
+                    yield _sse_event("feedback", {"delta": value})
+                else:
+                    result = OpenAIResponse(
+                        score=value.get("score", 0),
+                        response=value.get("response", "No response provided."),
+                        degraded=value.get("degraded", False)
+                    )
+                    if not result.degraded:
+                        await progress_repo.add_score(current_user["_id"], {question["culture"]: result.score})
+                    yield _sse_event("done", result.model_dump())
+        except GradingOverloaded as e:
+            yield _sse_event("error", {"detail": "Grading is at capacity, please retry", "retry_after": e.retry_after})
+        except InvalidGradeOutput:
+            yield _sse_event("error", {"detail": "The grader returned a response without a usable score."})
+        except GraderUnavailable as e:
+            yield _sse_event("error", {"detail": "The grader is temporarily unavailable, please retry", "retry_after": e.retry_after})
+        except Exception as e:
+            yield _sse_event("error", {"detail": f"Error calling OpenAI API: {str(e)}"})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def _job_response(job):
+    finished = job["status"] in FINISHED_STATUSES
+    return {
+        "job_id": str(job["_id"]),
+        "status": job["status"],
+        "score": job.get("score"),
+        "response": job.get("response"),
+        "error": job.get("error") if finished else None,
+    }
+
+@app.post("/advancedQuestion/{question_id}/answer/jobs", response_model=GradingJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def submit_advanced_answer_job(
+    question_id: str,
+    answer: AnswerSubmission,
+    response: Response,
+    current_user: dict = Depends(get_current_principal)
+):
+    question = await advanced_questions.get_by_id(question_id)
+    if not question:
+        raise HTTPException(status_code=404, detail="Question not found")
+    check_grading_rate(current_user["_id"])
+
+    job = await grading_jobs.create(current_user["_id"], question["_id"], answer.user_answer)
+    grading_workers.notify_submitted()
+    response.headers["Location"] = f"/advancedQuestion/jobs/{job['_id']}"
+    return _job_response(job)
+
+@app.get("/advancedQuestion/jobs/{job_id}", response_model=GradingJobResponse)
+async def get_advanced_answer_job(
+    job_id: str,
+    wait: float = Query(default=0, ge=0, description="Seconds to wait for the job to finish (long poll)"),
+    current_user: dict = Depends(get_current_principal)
+):
+    job = await grading_jobs.get_for_user(job_id, current_user["_id"])
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    deadline = time.monotonic() + min(wait, GRADING_JOB_MAX_WAIT_SECONDS)
+    while job["status"] not in FINISHED_STATUSES:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        # Woken straight away when this process finishes the job; otherwise re-checked periodically
+        await grading_workers.wait_for(str(job["_id"]), min(remaining, grading_workers.poll_seconds))
+        job = await grading_jobs.get_for_user(job_id, current_user["_id"])
+    return _job_response(job)
+
 
 # async def generate_response(question_id: str, answer: str):
 #     client = OpenAI(api_key=OPEN_AI_API_KEY)
@@ -0,0 +1,235 @@
+"""Prometheus metrics for HTTP routes, Mongo commands, LLM calls and caches.
+
+Everything is registered on ``REGISTRY`` and served by ``GET /metrics``.
+Label values are kept to bounded sets (route templates, command and
+collection names) so the number of series does not grow with traffic.
+"""
+import time
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from pymongo import monitoring
+from starlette.routing import Match
+
+REGISTRY = CollectorRegistry(auto_describe=True)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Time spent handling HTTP requests, including streamed bodies.",
+    ["method", "route", "status"],
+    registry=REGISTRY,
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "HTTP requests currently being handled.",
+    ["method", "route"],
+    registry=REGISTRY,
+)
+
+MONGO_COMMAND_DURATION = Histogram(
+    "mongo_command_duration_seconds",
+    "Round-trip time of MongoDB commands as reported by the driver.",
+    ["command", "collection"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+    registry=REGISTRY,
+)
+MONGO_COMMAND_FAILURES = Counter(
+    "mongo_command_failures_total",
+    "MongoDB commands that returned an error.",
+    ["command", "collection"],
+    registry=REGISTRY,
+)
+
+LLM_REQUEST_DURATION = Histogram(
+    "llm_request_duration_seconds",
+    "Time spent waiting on the grading LLM.",
+    ["operation"],
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0),
+    registry=REGISTRY,
+)
+LLM_ERRORS = Counter(
+    "llm_errors_total",
+    "Failed grading LLM calls, by exception type.",
+    ["operation", "error"],
+    registry=REGISTRY,
+)
+LLM_TOKENS = Counter(
+    "llm_tokens_total",
+    "Tokens reported by the grading LLM.",
+    ["kind"],
+    registry=REGISTRY,
+)
+LLM_TOKENS_PER_CALL = Histogram(
+    "llm_tokens_per_call",
+    "Tokens used by a single grading LLM call, by kind and prompt version.",
+    ["kind", "prompt_version"],
+    buckets=(25, 50, 100, 200, 400, 800, 1600, 3200),
+    registry=REGISTRY,
+)
+LLM_RETRIES = Counter(
+    "llm_retries_total",
+    "Grading LLM attempts retried after a transient error.",
+    ["operation"],
+    registry=REGISTRY,
+)
+LLM_HEDGES = Counter(
+    "llm_hedged_requests_total",
+    "Second grading LLM requests sent because the first was slow.",
+    registry=REGISTRY,
+)
+GRADER_BREAKER_STATE = Gauge(
+    "grader_circuit_breaker_state",
+    "Grading LLM circuit breaker: 0 closed, 1 half-open, 2 open.",
+    registry=REGISTRY,
+)
+GRADING_DEGRADED = Counter(
+    "grading_degraded_total",
+    "Answers given an estimated score because the grader was unavailable.",
+    registry=REGISTRY,
+)
+GRADE_OUTPUTS = Counter(
+    "grade_outputs_total",
+    "Grading LLM replies by outcome: valid, repaired locally, or invalid (re-asked or failed).",
+    ["outcome"],
+    registry=REGISTRY,
+)
+
+PRESCORE_DECISIONS = Counter(
+    "prescore_decisions_total",
+    "Advanced answers resolved locally (accepted/rejected) or escalated to the LLM.",
+    ["outcome"],
+    registry=REGISTRY,
+)
+
+GRADING_IN_FLIGHT = Gauge(
+    "grading_in_flight",
+    "Grading LLM calls holding an admission slot.",
+    registry=REGISTRY,
+)
+GRADING_QUEUE_DEPTH = Gauge(
+    "grading_queue_depth",
+    "Grading LLM calls waiting for an admission slot.",
+    registry=REGISTRY,
+)
+GRADING_QUEUE_WAIT = Histogram(
+    "grading_queue_wait_seconds",
+    "Time grading LLM calls waited for an admission slot.",
+    buckets=(0.0, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+    registry=REGISTRY,
+)
+GRADING_REJECTIONS = Counter(
+    "grading_rejections_total",
+    "Grading requests turned away (queue_full, timeout, rate_limited).",
+    ["reason"],
+    registry=REGISTRY,
+)
+
+def observe_llm_usage(usage, prompt_version):
+    """Record prompt and completion token counts from a completion's ``usage``."""
+    if usage is None:
+        return
+    for kind, tokens in (("prompt", usage.prompt_tokens or 0), ("completion", usage.completion_tokens or 0)):
+        LLM_TOKENS.labels(kind).inc(tokens)
+        LLM_TOKENS_PER_CALL.labels(kind, prompt_version).observe(tokens)
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Times every command sent by a client it is passed to.
+
+    Durations come from the driver; the collection name is only present on
+    the started event, so it is held until the matching reply arrives.
+    """
+
+    def __init__(self):
+        self._pending = {}
+
+    @staticmethod
+    def _key(event):
+        return event.connection_id, event.request_id
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        if not isinstance(collection, str):
+            # getMore carries the cursor id here and names the collection separately
+            collection = event.command.get("collection", "")
+            if not isinstance(collection, str):
+                collection = ""
+        self._pending[self._key(event)] = collection
+
+    def succeeded(self, event):
+        collection = self._pending.pop(self._key(event), "")
+        MONGO_COMMAND_DURATION.labels(event.command_name, collection).observe(event.duration_micros / 1e6)
+
+    def failed(self, event):
+        collection = self._pending.pop(self._key(event), "")
+        MONGO_COMMAND_DURATION.labels(event.command_name, collection).observe(event.duration_micros / 1e6)
+        MONGO_COMMAND_FAILURES.labels(event.command_name, collection).inc()
+
+mongo_listener = MongoCommandListener()
+
+class CacheCollector:
+    """Exposes the ``stats()`` of registered in-process caches at scrape time."""
+
+    def __init__(self):
+        self._caches = {}
+
+    def register(self, name, cache):
+        self._caches[name] = cache
+
+    def describe(self):
+        return []
+
+    def collect(self):
+        hits = CounterMetricFamily("cache_hits", "Cache lookups served from the cache.", labels=["cache"])
+        misses = CounterMetricFamily("cache_misses", "Cache lookups that fell through.", labels=["cache"])
+        ratio = GaugeMetricFamily("cache_hit_ratio", "Share of lookups served from the cache.", labels=["cache"])
+        size = GaugeMetricFamily("cache_entries", "Entries currently held in memory.", labels=["cache"])
+        for name, cache in self._caches.items():
+            stats = cache.stats()
+            hits.add_metric([name], stats["hits"] + stats.get("persistent_hits", 0))
+            misses.add_metric([name], stats["misses"])
+            ratio.add_metric([name], stats["hit_ratio"])
+            size.add_metric([name], stats["size"])
+        yield from (hits, misses, ratio, size)
+
+cache_collector = CacheCollector()
+REGISTRY.register(cache_collector)
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency and in-flight requests per route.
+
+    Requests are labelled with the matched route template (``/questions/{question_id}/answer``)
+    rather than the raw path; anything that matches no route is ``unmatched``.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    def _route(self, scope):
+        for route in scope["app"].router.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return route.path
+        return "unmatched"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = self._route(scope)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_flight = HTTP_REQUESTS_IN_FLIGHT.labels(method, route)
+        in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            in_flight.dec()
+            HTTP_REQUEST_DURATION.labels(method, route, str(status_code)).observe(time.perf_counter() - start)
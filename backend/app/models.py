@@ -1,12 +1,20 @@
-from mongoengine import Document, StringField, IntField, ListField, DateTimeField, ReferenceField
+from mongoengine import Document, StringField, IntField, ListField, DateTimeField, ReferenceField, BooleanField, ObjectIdField
 from datetime import datetime
 
+# Indexes are created explicitly (app startup, scripts/ensure_indexes.py) rather
+# than by mongoengine on first use, so a conflicting existing index is reported
+# instead of failing whichever script touches the collection first
+
 class User(Document):
     username = StringField(required=True, unique=True)
     hashed_password = StringField(required=True)
+    # Bumped to revoke every token issued so far
+    token_version = IntField(default=0)
+    is_admin = BooleanField(default=False)
     created_at = DateTimeField(default=datetime.utcnow)
 
     meta = {
+        'auto_create_index': False,
         'collection': 'users',
         'indexes': ['username']
     }
@@ -21,29 +29,132 @@ class Question(Document):
     tag = StringField(required=True)
     culture = StringField(required=True)
     created_at = DateTimeField(default=datetime.utcnow)
+    # Hash of the seeded definition, so re-seeding skips unchanged questions
+    content_hash = StringField()
 
     meta = {
+        'auto_create_index': False,
         'collection': 'questions',
-        'indexes': ['category', 'difficulty', 'tag']
+        'indexes': [
+            {'fields': ['tag'], 'unique': True},
+            # Keyset pagination over the catalog, optionally filtered by culture
+            ('culture', 'id'),
+            ('culture', 'category', 'id'),
+            ('culture', 'difficulty', 'id'),
+            ('category', 'id'),
+            ('difficulty', 'id'),
+        ]
     }
 
 class AdvancedQuestion(Document):
     question = StringField(required=True)
     correct_answer = StringField(required=True)
     culture = StringField(required=True)
+    tag = StringField()
+    content_hash = StringField()
 
     meta = {
+        'auto_create_index': False,
         'collection': 'advanced_questions',
-        'indexes': ['culture', 'question']
+        'indexes': [
+            'culture',
+            'question',
+            # Sparse because documents seeded before tags existed have none
+            {'fields': ['tag'], 'unique': True, 'sparse': True},
+        ]
     }
 
 class UserProgress(Document):
     user = ReferenceField(User, required=True)
     score = IntField(default=0, required=True)
+    # Legacy list of completed tags; completions now live in QuestionCompletion
+    # and scripts/migrate_completions.py moves old entries across
     completed_questions = ListField(StringField(), default=list)
+    # Grading jobs whose score is credited but not yet marked on the job, so a
+    # retried job cannot credit twice; ids are removed once the job is marked
+    applied_jobs = ListField(ObjectIdField(), default=list)
     last_activity = DateTimeField(default=datetime.utcnow)
 
     meta = {
+        'auto_create_index': False,
         'collection': 'user_progress',
-        'indexes': ['user']
-    } 
\ No newline at end of file
+        # Unique so concurrent upserts cannot create a second progress document
+        'indexes': [{'fields': ['user'], 'unique': True}]
+    }
+
+class QuestionCompletion(Document):
+    user = ReferenceField(User, required=True)
+    tag = StringField(required=True)
+    completed_at = DateTimeField(default=datetime.utcnow)
+
+    meta = {
+        'auto_create_index': False,
+        'collection': 'question_completions',
+        'indexes': [
+            {'fields': ['user', 'tag'], 'unique': True},
+            # Lists a user's completions in order without sorting in memory
+            ('user', 'completed_at'),
+        ]
+    }
+
+class LeaderboardEntry(Document):
+    # "global" or a culture key such as "western"
+    scope = StringField(required=True)
+    user = ReferenceField(User, required=True)
+    score = IntField(default=0, required=True)
+
+    meta = {
+        'auto_create_index': False,
+        'collection': 'leaderboard_entries',
+        'indexes': [
+            {'fields': ['scope', 'user'], 'unique': True},
+            ('scope', '-score', 'user'),
+        ]
+    }
+
+class LeaderboardBucket(Document):
+    # Number of users in a scope holding exactly this score, so a rank is a
+    # sum over distinct scores rather than a count over every user
+    scope = StringField(required=True)
+    score = IntField(required=True)
+    count = IntField(default=0, required=True)
+
+    meta = {
+        'auto_create_index': False,
+        'collection': 'leaderboard_buckets',
+        'indexes': [{'fields': ['scope', 'score'], 'unique': True}]
+    }
+
+class GradingJob(Document):
+    """An advanced answer queued for background grading."""
+    user = ReferenceField(User, required=True)
+    question = ReferenceField(AdvancedQuestion, required=True)
+    user_answer = StringField(required=True)
+    # pending -> running -> done, or failed once attempts run out
+    status = StringField(required=True, default="pending", choices=("pending", "running", "done", "failed"))
+    attempts = IntField(default=0)
+    # Set while a worker holds the job; an expired lease lets another worker take over
+    worker = StringField()
+    lease_expires_at = DateTimeField()
+    score = IntField()
+    response = StringField()
+    error = StringField()
+    progress_applied = BooleanField(default=False)
+    created_at = DateTimeField(default=datetime.utcnow)
+    finished_at = DateTimeField()
+
+    meta = {
+        'auto_create_index': False,
+        'collection': 'grading_jobs',
+        'indexes': [
+            # Claims take the oldest pending job; expired leases are filtered on the fetched documents
+            ('status', 'created_at'),
+            # Finished jobs are kept for a week so clients can still fetch results
+            {'fields': ['finished_at'], 'expireAfterSeconds': 7 * 24 * 3600},
+        ]
+    }
+
+# Every model whose declared indexes are created at startup and audited by scripts/ensure_indexes.py
+INDEXED_MODELS = [
+    User, Question, AdvancedQuestion, UserProgress, QuestionCompletion, LeaderboardEntry, LeaderboardBucket, GradingJob
+]
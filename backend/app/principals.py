@@ -0,0 +1,66 @@
+import os
+import time
+from collections import OrderedDict
+
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "30"))
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+
+def make_principal(user):
+    """Reduce a user document to the identity fields handlers rely on."""
+    return {
+        "_id": user["_id"],
+        "username": user["username"],
+        "token_version": user.get("token_version", 0),
+        "is_admin": user.get("is_admin", False),
+    }
+
+class PrincipalCache:
+    """Short-lived cache of verified principals keyed by user id.
+
+    A cached principal lets an authenticated request skip the users
+    collection entirely. Entries expire after ``ttl_seconds`` and are dropped
+    explicitly whenever the user's token version changes.
+    """
+
+    def __init__(self, max_size, ttl_seconds):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id, token_version):
+        entry = self._entries.get(user_id)
+        if entry is not None:
+            expires_at, principal = entry
+            if expires_at > time.monotonic() and principal["token_version"] == token_version:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return principal
+            del self._entries[user_id]
+        self.misses += 1
+        return None
+
+    def set(self, principal):
+        user_id = str(principal["_id"])
+        self._entries[user_id] = (time.monotonic() + self.ttl_seconds, principal)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        self._entries.pop(str(user_id), None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+principal_cache = PrincipalCache(PRINCIPAL_CACHE_SIZE, PRINCIPAL_CACHE_TTL_SECONDS)
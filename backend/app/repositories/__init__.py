@@ -0,0 +1,6 @@
+"""Async data access for the request path.
+
+The mongoengine models in ``app.models`` stay the source of truth for
+collection names, defaults and validation; these modules read and write the
+same collections through motor so handlers never block the event loop.
+"""
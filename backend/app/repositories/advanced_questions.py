@@ -0,0 +1,35 @@
+from ..models import AdvancedQuestion
+from ..catalog_io import AdvancedQuestionDefinition, advanced_question_tagger, load_collection_async
+from .base import collection_for, to_object_id
+
+def _collection():
+    return collection_for(AdvancedQuestion)
+
+async def get_by_culture(culture):
+    return await _collection().find_one({"culture": culture})
+
+async def get_by_id(question_id):
+    object_id = to_object_id(question_id)
+    if object_id is None:
+        return None
+    return await _collection().find_one({"_id": object_id})
+
+async def get_many(question_ids):
+    """Fetch several questions in one query, keyed by their string id."""
+    object_ids = [object_id for object_id in map(to_object_id, question_ids) if object_id is not None]
+    cursor = _collection().find({"_id": {"$in": object_ids}})
+    return {str(question["_id"]): question async for question in cursor}
+
+async def list_correct_answers():
+    """Every question's correct answer keyed by string id (a full scan, for corpus statistics)."""
+    cursor = _collection().find({}, {"correct_answer": 1})
+    return {str(question["_id"]): question["correct_answer"] async for question in cursor}
+
+def export_cursor(batch_size):
+    return _collection().find({}, {"content_hash": 0}).sort("_id", 1).batch_size(batch_size)
+
+async def import_records(records, batch_size, prune=False):
+    return await load_collection_async(
+        _collection(), records, AdvancedQuestionDefinition, advanced_question_tagger(), batch_size, prune=prune,
+        require_tag=True
+    )
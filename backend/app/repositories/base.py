@@ -0,0 +1,22 @@
+from bson import ObjectId
+from bson.errors import InvalidId
+from ..database import get_async_db
+
+def collection_for(document_cls):
+    """Return the motor collection backing a mongoengine document class."""
+    return get_async_db()[document_cls._get_collection_name()]
+
+def to_object_id(value):
+    """Coerce a path/query id into an ObjectId, or None if it is not valid."""
+    if isinstance(value, ObjectId):
+        return value
+    try:
+        return ObjectId(value)
+    except (InvalidId, TypeError):
+        return None
+
+def new_document(document_cls, **fields):
+    """Build a raw document using the model's defaults and validation."""
+    document = document_cls(**fields)
+    document.validate()
+    return document.to_mongo().to_dict()
@@ -0,0 +1,23 @@
+from ..models import QuestionCompletion
+from .base import collection_for, new_document
+
+def _collection():
+    return collection_for(QuestionCompletion)
+
+async def mark_completed(user_id, tag):
+    """Record a completed question; returns its new id, or None if it was already completed."""
+    completion = new_document(QuestionCompletion, user=user_id, tag=tag)
+    result = await _collection().update_one(
+        {"user": user_id, "tag": tag},
+        {"$setOnInsert": {"completed_at": completion["completed_at"]}},
+        upsert=True,
+    )
+    return result.upserted_id
+
+async def unmark_completed(completion_id):
+    """Remove a completion recorded by ``mark_completed`` whose point could not be awarded."""
+    await _collection().delete_one({"_id": completion_id})
+
+async def list_tags(user_id):
+    cursor = _collection().find({"user": user_id}, {"_id": 0, "tag": 1}).sort("completed_at", 1)
+    return [completion["tag"] async for completion in cursor]
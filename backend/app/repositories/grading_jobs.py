@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta
+from pymongo import ReturnDocument
+from ..models import GradingJob
+from .base import collection_for, new_document, to_object_id
+
+def _collection():
+    return collection_for(GradingJob)
+
+async def create(user_id, question_id, user_answer):
+    job = new_document(GradingJob, user=user_id, question=question_id, user_answer=user_answer)
+    result = await _collection().insert_one(job)
+    job["_id"] = result.inserted_id
+    return job
+
+async def get_for_user(job_id, user_id):
+    """Fetch a job, but only if it belongs to ``user_id``."""
+    object_id = to_object_id(job_id)
+    if object_id is None:
+        return None
+    return await _collection().find_one({"_id": object_id, "user": user_id})
+
+async def claim(worker_id, lease_seconds):
+    """Lease the oldest pending job, or a running one whose worker's lease expired."""
+    now = datetime.utcnow()
+    return await _collection().find_one_and_update(
+        {"$or": [
+            {"status": "pending"},
+            {"status": "running", "lease_expires_at": {"$lt": now}},
+        ]},
+        {
+            "$set": {"status": "running", "worker": worker_id, "lease_expires_at": now + timedelta(seconds=lease_seconds)},
+            "$inc": {"attempts": 1},
+        },
+        sort=[("created_at", 1)],
+        return_document=ReturnDocument.AFTER,
+    )
+
+async def claim_unapplied(worker_id, lease_seconds):
+    """Lease a graded job whose worker stopped before adding the score to progress."""
+    now = datetime.utcnow()
+    return await _collection().find_one_and_update(
+        {"status": "done", "progress_applied": False, "lease_expires_at": {"$lt": now}},
+        {"$set": {"worker": worker_id, "lease_expires_at": now + timedelta(seconds=lease_seconds)}},
+        return_document=ReturnDocument.AFTER,
+    )
+
+async def complete(job_id, worker_id, score, response):
+    """Store the result; returns False if the lease was lost to another worker."""
+    result = await _collection().update_one(
+        {"_id": job_id, "worker": worker_id},
+        {"$set": {"status": "done", "score": score, "response": response, "error": None}},
+    )
+    return result.matched_count == 1
+
+async def mark_progress_applied(job_id, worker_id):
+    await _collection().update_one(
+        {"_id": job_id, "worker": worker_id},
+        {"$set": {"progress_applied": True, "finished_at": datetime.utcnow()}, "$unset": {"lease_expires_at": ""}},
+    )
+
+async def release(job_id, worker_id, error, failed, count_attempt=True):
+    """Give a running job back after an error, marking it failed once attempts run out."""
+    update = {"$set": {"error": error}, "$unset": {"worker": "", "lease_expires_at": ""}}
+    if failed:
+        update["$set"].update(status="failed", finished_at=datetime.utcnow())
+    else:
+        update["$set"]["status"] = "pending"
+    if not count_attempt:
+        update["$inc"] = {"attempts": -1}
+    await _collection().update_one({"_id": job_id, "worker": worker_id, "status": "running"}, update)
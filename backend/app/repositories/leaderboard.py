@@ -0,0 +1,73 @@
+import asyncio
+from pymongo import UpdateOne
+from ..models import LeaderboardBucket, LeaderboardEntry
+from .base import collection_for
+
+GLOBAL_SCOPE = "global"
+
+def _entries():
+    return collection_for(LeaderboardEntry)
+
+def _buckets():
+    return collection_for(LeaderboardBucket)
+
+async def _record_scope(scope, user_id, points):
+    previous = await _entries().find_one_and_update(
+        {"scope": scope, "user": user_id},
+        {"$inc": {"score": points}},
+        upsert=True,
+        projection={"score": 1},
+    )
+    old_score = previous["score"] if previous else None
+    new_score = (old_score or 0) + points
+
+    operations = [UpdateOne({"scope": scope, "score": new_score}, {"$inc": {"count": 1}}, upsert=True)]
+    if old_score is not None:
+        operations.append(UpdateOne({"scope": scope, "score": old_score}, {"$inc": {"count": -1}}))
+    await _buckets().bulk_write(operations, ordered=False)
+
+async def record(user_id, points_by_culture):
+    """Apply score changes to the global and per-culture rankings."""
+    changes = {scope: points for scope, points in points_by_culture.items() if scope and points}
+    total = sum(points_by_culture.values())
+    if total:
+        changes[GLOBAL_SCOPE] = total
+    await asyncio.gather(*(_record_scope(scope, user_id, points) for scope, points in changes.items()))
+
+async def top(scope, limit):
+    """Return the top ``limit`` entries of a scope with competition ranks."""
+    entries = await _entries().find(
+        {"scope": scope}, {"_id": 0, "user": 1, "score": 1}
+    ).sort([("score", -1), ("user", 1)]).limit(limit).to_list(length=None)
+
+    ranked = []
+    for position, entry in enumerate(entries):
+        if position and entry["score"] == entries[position - 1]["score"]:
+            rank = ranked[-1]["rank"]
+        else:
+            rank = position + 1
+        ranked.append({**entry, "rank": rank})
+    return ranked
+
+async def rank_of(scope, user_id):
+    """Return ``{"rank", "score", "total"}`` for a user, or None if unranked."""
+    entry = await _entries().find_one({"scope": scope, "user": user_id}, {"score": 1})
+    if entry is None:
+        return None
+    result = await _buckets().aggregate([
+        {"$match": {"scope": scope}},
+        {"$group": {
+            "_id": None,
+            "above": {"$sum": {"$cond": [{"$gt": ["$score", entry["score"]]}, "$count", 0]}},
+            "total": {"$sum": "$count"},
+        }},
+    ]).to_list(length=1)
+    above, total = (result[0]["above"], result[0]["total"]) if result else (0, 1)
+    return {"rank": above + 1, "score": entry["score"], "total": total}
+
+async def total(scope):
+    result = await _buckets().aggregate([
+        {"$match": {"scope": scope}},
+        {"$group": {"_id": None, "total": {"$sum": "$count"}}},
+    ]).to_list(length=1)
+    return result[0]["total"] if result else 0
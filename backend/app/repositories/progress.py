@@ -0,0 +1,134 @@
+import asyncio
+from datetime import datetime
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from ..models import UserProgress
+from .base import collection_for, new_document
+from . import completions, leaderboard
+
+def _collection():
+    return collection_for(UserProgress)
+
+def new_progress(user_id):
+    """Return an unsaved progress document with the model defaults."""
+    return new_document(UserProgress, user=user_id)
+
+def _insert_defaults(user_id, *updated_fields):
+    """Model defaults for an upsert, minus the fields the update itself sets."""
+    return {
+        field: value for field, value in new_progress(user_id).items()
+        if field not in ("_id", "user") + updated_fields
+    }
+
+def _upsert(user_id, update, *updated_fields):
+    defaults = _insert_defaults(user_id, *updated_fields)
+    if defaults:
+        update = {**update, "$setOnInsert": defaults}
+    return update
+
+async def _ensure_exists(user_id):
+    """Create the user's progress document if it is missing.
+
+    Conditional updates run after this with ``upsert=False``, so a filter that
+    misses means "already counted" rather than inserting a second document.
+    """
+    try:
+        await _collection().update_one(
+            {"user": user_id}, {"$setOnInsert": _insert_defaults(user_id)}, upsert=True
+        )
+    except DuplicateKeyError:
+        # Created concurrently by another request
+        pass
+
+async def get_or_create(user_id):
+    """Return the user's progress with its completed tags, creating it if needed."""
+    progress, completed_tags = await asyncio.gather(
+        _collection().find_one_and_update(
+            {"user": user_id},
+            {"$setOnInsert": _insert_defaults(user_id)},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        ),
+        completions.list_tags(user_id),
+    )
+    # Tags still in the legacy list have not been migrated yet
+    migrated = set(completed_tags)
+    legacy_tags = [tag for tag in progress.get("completed_questions", []) if tag not in migrated]
+    progress["completed_questions"] = legacy_tags + completed_tags
+    return progress
+
+async def touch(user_id):
+    """Record activity without changing the score."""
+    update = {"$set": {"last_activity": datetime.utcnow()}}
+    await _collection().update_one(
+        {"user": user_id}, _upsert(user_id, update, "last_activity"), upsert=True
+    )
+
+async def complete_question(user_id, tag, culture):
+    """Award a point for ``tag`` unless it was already completed.
+
+    Membership is decided by the unique (user, tag) index on the completions
+    collection, so answering from two devices cannot double-count. If the
+    score update fails the completion is removed again, so a retry can still
+    award the point.
+    """
+    completion_id = await completions.mark_completed(user_id, tag)
+    if completion_id is None:
+        await touch(user_id)
+        return
+
+    # Until the legacy list is migrated a tag may already be counted there,
+    # in which case the filter misses
+    update = {
+        "$inc": {"score": 1},
+        "$set": {"last_activity": datetime.utcnow()},
+    }
+    try:
+        await _ensure_exists(user_id)
+        result = await _collection().update_one(
+            {"user": user_id, "completed_questions": {"$ne": tag}}, update
+        )
+    except BaseException:
+        # Also on cancellation: the point was not awarded, so neither is the completion
+        await asyncio.shield(completions.unmark_completed(completion_id))
+        raise
+    if result.matched_count == 0:
+        await touch(user_id)
+        return
+    await leaderboard.record(user_id, {culture: 1})
+
+async def add_job_score(user_id, job_id, points_by_culture):
+    """Credit a grading job's points once, however often the job is retried.
+
+    The job id is added in the same write as the points, and a progress
+    document that already lists it is left alone. Returns False if the job
+    was already credited. Call ``forget_job`` once the job is marked applied.
+    """
+    update = {
+        "$inc": {"score": sum(points_by_culture.values())},
+        "$set": {"last_activity": datetime.utcnow()},
+        "$addToSet": {"applied_jobs": job_id},
+    }
+    await _ensure_exists(user_id)
+    # If the id is already listed the filter misses
+    result = await _collection().update_one(
+        {"user": user_id, "applied_jobs": {"$ne": job_id}}, update
+    )
+    if result.matched_count == 0:
+        return False
+    await leaderboard.record(user_id, points_by_culture)
+    return True
+
+async def forget_job(user_id, job_id):
+    await _collection().update_one({"user": user_id}, {"$pull": {"applied_jobs": job_id}})
+
+async def add_score(user_id, points_by_culture):
+    """Add points earned per culture and update the leaderboards."""
+    update = {
+        "$inc": {"score": sum(points_by_culture.values())},
+        "$set": {"last_activity": datetime.utcnow()},
+    }
+    await _collection().update_one(
+        {"user": user_id}, _upsert(user_id, update, "score", "last_activity"), upsert=True
+    )
+    await leaderboard.record(user_id, points_by_culture)
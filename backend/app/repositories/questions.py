@@ -0,0 +1,52 @@
+from datetime import datetime
+from ..models import Question
+from ..catalog_io import QuestionDefinition, load_collection_async, question_tagger
+from .base import collection_for, new_document, to_object_id
+
+def _collection():
+    return collection_for(Question)
+
+async def list_questions(culture=None, category=None, difficulty=None, after=None, limit=None, fields=None):
+    """List questions in ``_id`` order, starting after the ``after`` cursor.
+
+    ``fields`` restricts the returned fields (``_id`` is always included, and
+    is all that an empty ``fields`` returns).
+    """
+    query = {}
+    if culture:
+        query["culture"] = culture
+    if category:
+        query["category"] = category
+    if difficulty:
+        query["difficulty"] = difficulty
+    if after is not None:
+        query["_id"] = {"$gt": after}
+    projection = {"_id": 1, **{field: 1 for field in fields}} if fields is not None else None
+    cursor = _collection().find(query, projection).sort("_id", 1)
+    if limit:
+        cursor = cursor.limit(limit)
+    return await cursor.to_list(length=None)
+
+async def list_cultures():
+    return await _collection().distinct("culture")
+
+async def get_by_id(question_id):
+    object_id = to_object_id(question_id)
+    if object_id is None:
+        return None
+    return await _collection().find_one({"_id": object_id})
+
+async def create(**fields):
+    question = new_document(Question, **fields)
+    result = await _collection().insert_one(question)
+    question["_id"] = result.inserted_id
+    return question
+
+def export_cursor(batch_size):
+    return _collection().find({}, {"content_hash": 0}).sort("_id", 1).batch_size(batch_size)
+
+async def import_records(records, batch_size, prune=False):
+    return await load_collection_async(
+        _collection(), records, QuestionDefinition, question_tagger(), batch_size,
+        insert_defaults={"created_at": datetime.utcnow()}, prune=prune, require_tag=True
+    )
@@ -0,0 +1,32 @@
+from ..models import User
+from .base import collection_for, new_document, to_object_id
+
+def _collection():
+    return collection_for(User)
+
+async def get_by_username(username):
+    return await _collection().find_one({"username": username})
+
+async def get_by_id(user_id, fields=None):
+    """Fetch a user; ``fields`` restricts the returned fields (``_id`` is always included)."""
+    object_id = to_object_id(user_id)
+    if object_id is None:
+        return None
+    projection = {field: 1 for field in fields} if fields else None
+    return await _collection().find_one({"_id": object_id}, projection)
+
+async def create(username, hashed_password):
+    user = new_document(User, username=username, hashed_password=hashed_password)
+    result = await _collection().insert_one(user)
+    user["_id"] = result.inserted_id
+    return user
+
+async def bump_token_version(user_id):
+    await _collection().update_one({"_id": user_id}, {"$inc": {"token_version": 1}})
+
+async def update_password_hash(user_id, hashed_password):
+    await _collection().update_one({"_id": user_id}, {"$set": {"hashed_password": hashed_password}})
+
+async def usernames_by_id(user_ids):
+    cursor = _collection().find({"_id": {"$in": list(user_ids)}}, {"username": 1})
+    return {user["_id"]: user["username"] async for user in cursor}
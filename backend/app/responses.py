@@ -0,0 +1,23 @@
+"""Fast JSON encoding for responses built straight from Mongo documents."""
+import orjson
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+
+def _default(value):
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+def dumps(content):
+    """Encode with orjson; ObjectIds become strings and datetimes ISO 8601."""
+    return orjson.dumps(content, default=_default, option=orjson.OPT_UTC_Z)
+
+class MongoJSONResponse(JSONResponse):
+    """JSON response that accepts raw documents (ObjectId, datetime) as they come from motor.
+
+    Handlers that return one directly skip response-model validation, so the
+    content must already have the documented shape.
+    """
+
+    def render(self, content):
+        return dumps(content)
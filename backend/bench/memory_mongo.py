@@ -0,0 +1,21 @@
+"""In-process stand-in for MongoDB used by the benchmark."""
+
+def use_memory_mongo():
+    """Point both Mongo clients at one shared in-process mongomock database.
+
+    Must run before ``connect_db()`` is called and before the app's lifespan
+    starts, since both clients are created on first use and then reused.
+    """
+    import mongoengine
+    import mongomock
+    import mongomock_motor
+    from app import database
+
+    client = mongomock.MongoClient(tz_aware=True)
+
+    class SharedClient(mongomock.MongoClient):
+        def __new__(cls, *args, **kwargs):
+            return client
+
+    database.connect = lambda **kwargs: mongoengine.connect(db=database.DB_NAME, mongo_client_class=SharedClient)
+    database.AsyncIOMotorClient = lambda *args, **kwargs: mongomock_motor.AsyncMongoMockClient(mock_mongo_client=client)
@@ -0,0 +1,255 @@
+"""Drive a realistic traffic mix against the API in-process and report latency.
+
+Each virtual user signs up once and then repeats a session: log in, page
+through a culture's catalog, answer a question, check progress and answer
+an advanced question. Requests go through httpx's ASGI transport, so the
+numbers measure the app (routing, validation, Mongo, serialization)
+without network noise. Grading uses the local grader backend with a
+configurable latency.
+
+Usage (from backend/):
+    python -m bench.run                              # in-process Mongo stand-in
+    python -m bench.run --mongo-uri mongodb://localhost:27017
+    python -m bench.run --save bench/baselines/main.json
+    python -m bench.run --compare bench/baselines/main.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CULTURES = ["western", "east_asian", "south_asian", "middle_eastern"]
+PASSWORD = "bench-password"
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = max(0, math.ceil(fraction * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.enabled = True
+
+    async def call(self, name, request):
+        start = time.perf_counter()
+        response = await request
+        elapsed = time.perf_counter() - start
+        if self.enabled:
+            self.latencies[name].append(elapsed)
+            if response.status_code >= 400:
+                self.errors[name] += 1
+        return response
+
+    def summary(self, duration):
+        endpoints = {}
+        for name, values in sorted(self.latencies.items()):
+            values = sorted(values)
+            endpoints[name] = {
+                "count": len(values),
+                "errors": self.errors[name],
+                "rps": round(len(values) / duration, 2) if duration else 0.0,
+                "mean_ms": round(sum(values) / len(values) * 1000, 3),
+                "p50_ms": round(percentile(values, 0.50) * 1000, 3),
+                "p95_ms": round(percentile(values, 0.95) * 1000, 3),
+                "p99_ms": round(percentile(values, 0.99) * 1000, 3),
+            }
+        return endpoints
+
+def seed_catalog():
+    """Load the bundled question definitions (a no-op when already present)."""
+    from app.catalog_io import iter_file, load_collection, question_tagger, advanced_question_tagger, QuestionDefinition, AdvancedQuestionDefinition
+    from app.models import Question, AdvancedQuestion
+
+    load_collection(
+        Question._get_collection(), iter_file(os.path.join(BACKEND_DIR, "data", "questions.jsonl")),
+        QuestionDefinition, question_tagger(), 500,
+        insert_defaults={"created_at": datetime.utcnow()}, prune=False
+    )
+    load_collection(
+        AdvancedQuestion._get_collection(), iter_file(os.path.join(BACKEND_DIR, "data", "advanced_questions.jsonl")),
+        AdvancedQuestionDefinition, advanced_question_tagger(), 500, prune=False
+    )
+
+async def session(client, recorder, username, culture, iteration):
+    response = await recorder.call("POST /token", client.post("/token", data={"username": username, "password": PASSWORD}))
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    response = await recorder.call("GET /questions/", client.get("/questions/", params={"culture": culture, "limit": 20}, headers=headers))
+    catalog = response.json()
+    if catalog:
+        question = catalog[iteration % len(catalog)]
+        await recorder.call(
+            "POST /questions/{id}/answer",
+            client.post(f"/questions/{question['_id']}/answer", json={"user_answer": question["correct_answer"]}, headers=headers)
+        )
+
+    await recorder.call("GET /progress/", client.get("/progress/", headers=headers))
+
+    response = await recorder.call("GET /advancedQuestion/", client.get("/advancedQuestion/", params={"culture": culture}, headers=headers))
+    if response.status_code == 200:
+        question = response.json()
+        # Unique and on-topic, so neither the grading cache nor the pre-scorer hides the LLM path
+        answer = f"{question['question']} It depends on respect and context ({username}, attempt {iteration})"
+        await recorder.call(
+            "POST /advancedQuestion/{id}/answer/",
+            client.post(f"/advancedQuestion/{question['id']}/answer/", json={"user_answer": answer}, headers=headers)
+        )
+
+async def virtual_user(client, recorder, username, culture, iterations):
+    for iteration in range(iterations):
+        await session(client, recorder, username, culture, iteration)
+
+async def run(args):
+    import httpx
+    from app.main import app
+
+    recorder = Recorder()
+    run_id = uuid.uuid4().hex[:8]
+    usernames = [f"bench-{run_id}-{n}" for n in range(args.users)]
+
+    from app.grading.backends import get_backend
+
+    async with app.router.lifespan_context(app):
+        grader = get_backend()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            for username in usernames:
+                response = await client.post("/users/", json={"username": username, "password": PASSWORD})
+                response.raise_for_status()
+
+            recorder.enabled = False
+            await asyncio.gather(*(
+                virtual_user(client, recorder, username, CULTURES[n % len(CULTURES)], args.warmup)
+                for n, username in enumerate(usernames)
+            ))
+
+            recorder.enabled = True
+            start = time.perf_counter()
+            await asyncio.gather(*(
+                virtual_user(client, recorder, username, CULTURES[n % len(CULTURES)], args.iterations)
+                for n, username in enumerate(usernames)
+            ))
+            duration = time.perf_counter() - start
+
+    total = sum(len(values) for values in recorder.latencies.values())
+    return {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "mongo": "memory" if args.mongo_uri is None else "mongod",
+            "users": args.users,
+            "iterations": args.iterations,
+            "llm_latency_ms": args.llm_latency_ms,
+            "llm_calls": grader.calls,
+            "duration_s": round(duration, 3),
+            "requests": total,
+            "rps": round(total / duration, 2) if duration else 0.0,
+        },
+        "endpoints": recorder.summary(duration),
+    }
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def print_report(result):
+    meta = result["meta"]
+    print(f"{meta['requests']} requests in {meta['duration_s']}s ({meta['rps']} req/s), "
+          f"{meta['users']} users x {meta['iterations']} sessions, mongo={meta['mongo']}")
+    print(f"{'endpoint':<36} {'count':>6} {'err':>4} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, stats in result["endpoints"].items():
+        print(f"{name:<36} {stats['count']:>6} {stats['errors']:>4} {stats['rps']:>8} "
+              f"{stats['p50_ms']:>9} {stats['p95_ms']:>9} {stats['p99_ms']:>9}")
+
+def compare(result, baseline, threshold, min_delta_ms):
+    """Print the change against ``baseline`` and return the regressed endpoints.
+
+    An endpoint regresses when its p50 or p95 grows by more than ``threshold``
+    (a fraction) and by more than ``min_delta_ms``, or when it starts failing.
+    """
+    regressions = []
+    print(f"\nAgainst baseline from {baseline['meta'].get('created_at')} (commit {baseline['meta'].get('commit')}):")
+    for name, stats in result["endpoints"].items():
+        before = baseline["endpoints"].get(name)
+        if before is None:
+            print(f"  {name:<36} new endpoint")
+            continue
+        changes = []
+        regressed = stats["errors"] > 0 and before["errors"] == 0
+        for metric in ("p50_ms", "p95_ms"):
+            delta = stats[metric] - before[metric]
+            ratio = delta / before[metric] if before[metric] else 0.0
+            changes.append(f"{metric[:3]} {before[metric]:.1f}->{stats[metric]:.1f} ({ratio:+.0%})")
+            if ratio > threshold and delta > min_delta_ms:
+                regressed = True
+        print(f"  {name:<36} {'  '.join(changes)}{'  REGRESSION' if regressed else ''}")
+        if regressed:
+            regressions.append(name)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the API in-process with the local grader backend.")
+    parser.add_argument("--mongo-uri", help="use this mongod instead of the in-process stand-in (writes to its mannerisms database)")
+    parser.add_argument("--users", type=int, default=20, help="concurrent virtual users")
+    parser.add_argument("--iterations", type=int, default=10, help="measured sessions per user")
+    parser.add_argument("--warmup", type=int, default=1, help="unmeasured sessions per user")
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0)
+    parser.add_argument("--llm-jitter-ms", type=float, default=50.0)
+    parser.add_argument("--save", metavar="PATH", help="write the results as a JSON baseline")
+    parser.add_argument("--compare", metavar="PATH", help="compare against a saved baseline and exit 1 on regressions")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown as a fraction (default 0.2)")
+    parser.add_argument("--min-delta-ms", type=float, default=2.0, help="ignore slowdowns smaller than this")
+    args = parser.parse_args()
+
+    os.environ.setdefault("JWT_SECRET", "bench-secret")
+    os.environ.setdefault("OPEN_AI_API_KEY", "bench")
+    os.environ.setdefault("OPEN_AI_MODEL", "bench")
+    os.environ["GRADER_BACKEND"] = "local"
+    os.environ["LOCAL_GRADER_LATENCY_MS"] = str(args.llm_latency_ms)
+    os.environ["LOCAL_GRADER_JITTER_MS"] = str(args.llm_jitter_ms)
+    if args.mongo_uri:
+        os.environ["MONGO_URI"] = args.mongo_uri
+    else:
+        os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
+        from bench.memory_mongo import use_memory_mongo
+        use_memory_mongo()
+
+    from app.database import connect_db
+    connect_db()
+    seed_catalog()
+
+    result = asyncio.run(run(args))
+    print_report(result)
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"\nSaved baseline to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(result, baseline, args.threshold, args.min_delta_ms):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
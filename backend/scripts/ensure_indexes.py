@@ -0,0 +1,180 @@
+"""Audit and apply the indexes declared in app/models.py.
+
+Compares the declared indexes with the live database, creates anything that
+is missing (``--dry-run`` only reports) and, with ``--rebuild``, drops and
+recreates indexes whose uniqueness differs from the declaration, such as the
+non-unique ``user_progress.user_1`` and ``questions.tag_1`` that mongoengine
+created before those were declared unique. It then runs ``explain()`` on every
+query shape the API issues and exits non-zero if any of them would do a
+collection scan or sort in memory.
+"""
+import sys
+import argparse
+from datetime import datetime
+from bson import ObjectId
+from pymongo.errors import OperationFailure
+from app.models import (
+    AdvancedQuestion, GradingJob, LeaderboardBucket, LeaderboardEntry, Question, QuestionCompletion, User, UserProgress,
+    INDEXED_MODELS as MODELS
+)
+from app.database import connect_db, ensure_indexes_sync
+
+# Representative filters for every query the API sends, with placeholder
+# values. Keep in sync with app/repositories when adding queries.
+QUERY_SHAPES = [
+    # users.get_by_username / users.get_by_id
+    (User, {"username": "example"}, None),
+    (User, {"_id": ObjectId()}, None),
+    (User, {"_id": {"$in": [ObjectId(), ObjectId()]}}, None),
+    # questions.list_questions / questions.get_by_id
+    (Question, {}, [("_id", 1)]),
+    (Question, {"_id": {"$gt": ObjectId()}}, [("_id", 1)]),
+    (Question, {"culture": "western"}, [("_id", 1)]),
+    (Question, {"culture": "western", "_id": {"$gt": ObjectId()}}, [("_id", 1)]),
+    (Question, {"culture": "western", "category": "Greetings"}, [("_id", 1)]),
+    (Question, {"culture": "western", "difficulty": "Easy"}, [("_id", 1)]),
+    (Question, {"culture": "western", "category": "Greetings", "difficulty": "Easy"}, [("_id", 1)]),
+    (Question, {"category": "Greetings"}, [("_id", 1)]),
+    (Question, {"difficulty": "Easy"}, [("_id", 1)]),
+    (Question, {"_id": ObjectId()}, None),
+    # advanced_questions.get_by_culture / get_by_id / get_many
+    (AdvancedQuestion, {"culture": "western"}, None),
+    (AdvancedQuestion, {"_id": ObjectId()}, None),
+    (AdvancedQuestion, {"_id": {"$in": [ObjectId(), ObjectId()]}}, None),
+    # progress.get_or_create / touch / add_score / complete_question
+    (UserProgress, {"user": ObjectId()}, None),
+    (UserProgress, {"user": ObjectId(), "completed_questions": {"$ne": "Western Greetings - 1"}}, None),
+    # completions.mark_completed / completions.list_tags
+    (QuestionCompletion, {"user": ObjectId(), "tag": "Western Greetings - 1"}, None),
+    (QuestionCompletion, {"user": ObjectId()}, [("completed_at", 1)]),
+    # leaderboard.record / top / rank_of / total
+    (LeaderboardEntry, {"scope": "global", "user": ObjectId()}, None),
+    (LeaderboardEntry, {"scope": "global"}, [("score", -1), ("user", 1)]),
+    (LeaderboardBucket, {"scope": "global", "score": 10}, None),
+    (LeaderboardBucket, {"scope": "global"}, None),
+    # grading_jobs.claim / claim_unapplied / get_for_user
+    (GradingJob, {"$or": [
+        {"status": "pending"},
+        {"status": "running", "lease_expires_at": {"$lt": datetime.utcnow()}},
+    ]}, [("created_at", 1)]),
+    (GradingJob, {"status": "done", "progress_applied": False, "lease_expires_at": {"$lt": datetime.utcnow()}}, None),
+    (GradingJob, {"_id": ObjectId(), "user": ObjectId()}, None),
+]
+
+def _index_key(fields):
+    return tuple((name, direction) for name, direction in fields)
+
+def declared_indexes(model):
+    """Map each declared index key to whether it must be unique."""
+    declared = {}
+    for spec in model._meta["index_specs"]:
+        declared[_index_key(spec["fields"])] = bool(spec.get("unique", False))
+    return declared
+
+def _raw_collection(model):
+    # Document._get_collection() would auto-create the declared indexes,
+    # hiding exactly the drift this script is meant to report
+    return model._get_db()[model._get_collection_name()]
+
+def live_indexes(model):
+    """Map each live index key to ``(name, unique)``."""
+    info = _raw_collection(model).index_information()
+    return {
+        _index_key(index["key"]): (name, bool(index.get("unique", False)))
+        for name, index in info.items() if name != "_id_"
+    }
+
+def rebuild_index(model, key, live_name):
+    """Drop ``live_name`` and recreate the index declared on ``key``; returns whether it worked."""
+    collection_name = model._get_collection_name()
+    spec = next(spec for spec in model._meta["index_specs"] if _index_key(spec["fields"]) == key)
+    collection = _raw_collection(model)
+    collection.drop_index(live_name)
+    try:
+        collection.create_index(spec["fields"], **{k: v for k, v in spec.items() if k != "fields"})
+    except OperationFailure as e:
+        # Usually duplicates that a unique index cannot accept; remove them and re-run
+        print(f"[{collection_name}] could not rebuild {list(key)}: {e}")
+        return False
+    print(f"[{collection_name}] rebuilt index {list(key)}")
+    return True
+
+def audit_indexes(dry_run=False, rebuild=False):
+    """Report index drift per collection, create missing indexes and optionally rebuild mismatched ones."""
+    ok = True
+    for model in MODELS:
+        collection_name = model._get_collection_name()
+        declared = declared_indexes(model)
+        live = live_indexes(model)
+
+        missing = [key for key in declared if key not in live]
+        mismatched = [key for key in declared if key in live and live[key][1] != declared[key]]
+        extra = [key for key in live if key not in declared]
+
+        for key in missing:
+            print(f"[{collection_name}] missing index {list(key)}")
+        for key in mismatched:
+            print(f"[{collection_name}] index {list(key)} should have unique={declared[key]}")
+            if rebuild and not dry_run:
+                ok = rebuild_index(model, key, live[key][0]) and ok
+            else:
+                print(f"[{collection_name}] run with --rebuild to drop and recreate it")
+                ok = False
+        for key in extra:
+            print(f"[{collection_name}] undeclared index {list(key)}")
+
+        if missing and not dry_run:
+            # Index builds on MongoDB 4.2+ do not block reads or writes
+            ensure_indexes_sync([model])
+            print(f"[{collection_name}] created {len(missing)} index(es)")
+        elif missing:
+            ok = False
+    return ok
+
+def _stages(plan):
+    yield plan["stage"]
+    for child in plan.get("inputStages", []) + ([plan["inputStage"]] if "inputStage" in plan else []):
+        yield from _stages(child)
+
+def check_query_plans():
+    """Explain every API query shape and report collection scans and in-memory sorts."""
+    ok = True
+    for model, query, sort in QUERY_SHAPES:
+        cursor = _raw_collection(model).find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        plan = cursor.explain()["queryPlanner"]["winningPlan"]
+        # Servers using the slot-based engine nest the classic plan one level down
+        stages = list(_stages(plan.get("queryPlan", plan)))
+        # A blocking SORT means no index provides the order (SORT_MERGE of sorted branches is fine)
+        if "COLLSCAN" in stages:
+            status = "COLLSCAN"
+        elif "SORT" in stages:
+            status = "SORT"
+        else:
+            status = "ok"
+        print(f"[{model._get_collection_name()}] {status:8} {query} sort={sort} -> {' <- '.join(stages)}")
+        if status != "ok":
+            ok = False
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dry-run", action="store_true", help="report missing indexes without creating them")
+    parser.add_argument("--skip-explain", action="store_true", help="do not check query plans")
+    parser.add_argument("--rebuild", action="store_true", help="drop and recreate indexes whose uniqueness differs")
+    args = parser.parse_args()
+
+    connect_db()
+
+    ok = audit_indexes(dry_run=args.dry_run, rebuild=args.rebuild)
+    if not args.skip_explain:
+        ok = check_query_plans() and ok
+
+    if not ok:
+        print("Index audit failed")
+        sys.exit(1)
+    print("Index audit passed")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Move legacy UserProgress.completed_questions lists into QuestionCompletion.
+
+Safe to run while the API is serving and to re-run: completions are upserted
+on the unique (user, tag) index and each list is cleared only after its tags
+have been written.
+"""
+import argparse
+from pymongo import UpdateOne
+from app.models import QuestionCompletion, UserProgress
+from app.database import connect_db, ensure_indexes_sync
+
+def migrate_completions(batch_size=500):
+    connect_db()
+    ensure_indexes_sync([QuestionCompletion])
+
+    progress_collection = UserProgress._get_collection()
+    completion_collection = QuestionCompletion._get_collection()
+
+    migrated_users = 0
+    migrated_tags = 0
+    cursor = progress_collection.find(
+        {"completed_questions.0": {"$exists": True}},
+        {"user": 1, "completed_questions": 1, "last_activity": 1},
+        batch_size=batch_size,
+    )
+    for progress in cursor:
+        tags = progress["completed_questions"]
+        completion_collection.bulk_write(
+            [
+                UpdateOne(
+                    {"user": progress["user"], "tag": tag},
+                    {"$setOnInsert": {"completed_at": progress.get("last_activity")}},
+                    upsert=True,
+                )
+                for tag in tags
+            ],
+            ordered=False,
+        )
+        # Only pull the tags that were copied, in case new ones raced in
+        progress_collection.update_one(
+            {"_id": progress["_id"]}, {"$pullAll": {"completed_questions": tags}}
+        )
+        migrated_users += 1
+        migrated_tags += len(tags)
+
+    print(f"Migrated {migrated_tags} completed questions for {migrated_users} users")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+    migrate_completions(batch_size=args.batch_size)
@@ -0,0 +1,63 @@
+"""Rebuild the materialized leaderboard.
+
+Seeds the global scope from ``user_progress`` scores (per-culture scopes
+only accumulate from new answers) and recomputes every score bucket from
+the entries, repairing any drift left by interrupted updates.
+"""
+from pymongo import ReplaceOne, UpdateOne
+from app.models import LeaderboardBucket, LeaderboardEntry, UserProgress
+from app.database import connect_db, ensure_indexes_sync
+
+GLOBAL_SCOPE = "global"
+BATCH_SIZE = 1000
+
+def _flush(collection, operations):
+    if operations:
+        collection.bulk_write(operations, ordered=False)
+        operations.clear()
+
+def rebuild_leaderboard():
+    connect_db()
+    ensure_indexes_sync([LeaderboardEntry, LeaderboardBucket])
+
+    entries = LeaderboardEntry._get_collection()
+    buckets = LeaderboardBucket._get_collection()
+
+    operations = []
+    for progress in UserProgress._get_collection().find({}, {"user": 1, "score": 1}):
+        operations.append(UpdateOne(
+            {"scope": GLOBAL_SCOPE, "user": progress["user"]},
+            {"$set": {"score": progress.get("score", 0)}},
+            upsert=True,
+        ))
+        if len(operations) >= BATCH_SIZE:
+            _flush(entries, operations)
+    _flush(entries, operations)
+    print("Seeded global leaderboard from user progress")
+
+    counts = entries.aggregate([
+        {"$group": {"_id": {"scope": "$scope", "score": "$score"}, "count": {"$sum": 1}}},
+    ])
+    seen = set()
+    for bucket in counts:
+        seen.add((bucket["_id"]["scope"], bucket["_id"]["score"]))
+        operations.append(ReplaceOne(
+            {"scope": bucket["_id"]["scope"], "score": bucket["_id"]["score"]},
+            {"scope": bucket["_id"]["scope"], "score": bucket["_id"]["score"], "count": bucket["count"]},
+            upsert=True,
+        ))
+        if len(operations) >= BATCH_SIZE:
+            _flush(buckets, operations)
+    _flush(buckets, operations)
+
+    # Drop buckets for scores nobody holds any more
+    stale = [
+        bucket["_id"] for bucket in buckets.find({}, {"scope": 1, "score": 1})
+        if (bucket["scope"], bucket["score"]) not in seen
+    ]
+    if stale:
+        buckets.delete_many({"_id": {"$in": stale}})
+    print("Rebuilt leaderboard score buckets")
+
+if __name__ == "__main__":
+    rebuild_leaderboard()
@@ -0,0 +1,20 @@
+"""Grant or revoke admin rights for a user."""
+import argparse
+from app.models import User
+from app.database import connect_db
+
+def set_admin(username, is_admin=True):
+    connect_db()
+    updated = User.objects(username=username).update_one(set__is_admin=is_admin)
+    if not updated:
+        print(f"User not found: {username}")
+        return
+    # Running workers pick this up once their cached principal expires
+    print(f"{'Granted' if is_admin else 'Revoked'} admin rights for {username}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("username")
+    parser.add_argument("--revoke", action="store_true", help="remove admin rights instead")
+    args = parser.parse_args()
+    set_admin(args.username, is_admin=not args.revoke)